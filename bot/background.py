@@ -0,0 +1,28 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Long-running tasks started by the bot, cancelled together on shutdown
+_tasks = set()
+
+def start(coro, name: str | None = None) -> asyncio.Task:
+    task = asyncio.create_task(coro, name=name)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+# Call `fn` every `interval` seconds until cancelled; errors are logged and the loop keeps going
+async def every(interval: float, fn, name: str = "periodic task"):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await fn()
+        except Exception as e:
+            logger.error(f"Error in {name}: {e}")
+
+async def stop_all():
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,133 @@
+"""Check the broadcast sender against a rate-limited fake Bot API.
+
+Run from the repository root:
+
+    python bot/benchmarks/broadcast_check.py [recipients] [rate]
+
+Broadcast rows and profiles live in memory instead of Supabase. The fake Bot
+API allows 30 messages per second and answers 429 with retry_after beyond
+that, and some users have blocked the bot. The check sends one broadcast,
+interrupts a second one part way and resumes it with a fresh sender, then
+verifies that every non-banned user got each broadcast, that the resumed run
+repeated at most one batch, and that the stored delivered/failed counts are
+right. It reports the achieved send rate and the number of 429s.
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Bot
+import repository
+from broadcasts import BroadcastSender
+from fake_telegram import FakeTelegram
+
+logging.basicConfig(level=logging.WARNING)
+for noisy in ("httpx", "tornado.access"):
+    logging.getLogger(noisy).setLevel(logging.ERROR)
+
+TELEGRAM_LIMIT = 30
+BATCH_SIZE = 50
+
+class MemoryStore:
+    """The broadcast_messages and profiles rows the sender reads and writes."""
+
+    def __init__(self, recipients: int):
+        self.profiles = [{"telegram_user_id": 5000 + i, "is_banned": i % 20 == 0} for i in range(recipients)]
+        self.broadcasts = {}
+
+    def add_broadcast(self, broadcast_id: str, message: str):
+        self.broadcasts[broadcast_id] = {
+            "id": broadcast_id, "message": message, "status": "pending",
+            "last_recipient_id": None, "recipient_count": 0, "failed_count": 0,
+        }
+
+    async def get_next_broadcast(self):
+        unfinished = [b for b in self.broadcasts.values() if b["status"] in ("sending", "pending")]
+        unfinished.sort(key=lambda b: b["status"] != "sending")
+        return dict(unfinished[0]) if unfinished else None
+
+    async def claim_broadcast(self, broadcast_id, changes):
+        broadcast = self.broadcasts[broadcast_id]
+        if broadcast["status"] != "pending":
+            return False
+        broadcast.update(changes, status="sending")
+        return True
+
+    async def update_broadcast(self, broadcast_id, changes):
+        self.broadcasts[broadcast_id].update(changes)
+
+    async def get_broadcast_recipients(self, after_id, limit):
+        ids = sorted(p["telegram_user_id"] for p in self.profiles if not p["is_banned"])
+        return [i for i in ids if after_id is None or i > after_id][:limit]
+
+    def install(self):
+        for name in ("get_next_broadcast", "claim_broadcast", "update_broadcast", "get_broadcast_recipients"):
+            setattr(repository, name, getattr(self, name))
+
+def deliveries(fake: FakeTelegram, message: str) -> dict:
+    counts = {}
+    for params in fake.calls_to("sendMessage"):
+        if params["text"] == message:
+            counts[params["chat_id"]] = counts.get(params["chat_id"], 0) + 1
+    return counts
+
+async def run(recipients: int, rate: float):
+    store = MemoryStore(recipients)
+    store.install()
+    active = [str(p["telegram_user_id"]) for p in store.profiles if not p["is_banned"]]
+    blocked = set(active[::25])
+
+    fake = FakeTelegram(rate_limit=TELEGRAM_LIMIT, blocked_chats=blocked)
+    await fake.start()
+    bot = Bot("123:LOCAL", base_url=fake.base_url)
+    await bot.initialize()
+
+    try:
+        # A full broadcast in one go
+        store.add_broadcast("b1", "First announcement")
+        start = time.perf_counter()
+        await BroadcastSender(rate=rate, batch_size=BATCH_SIZE).run_pending(bot)
+        elapsed = time.perf_counter() - start
+
+        counts = deliveries(fake, "First announcement")
+        assert set(counts) == set(active) - blocked, "some users were missed or banned users were messaged"
+        assert all(n == 1 for n in counts.values()), "some users got the broadcast twice"
+        b1 = store.broadcasts["b1"]
+        assert b1["status"] == "sent"
+        assert (b1["recipient_count"], b1["failed_count"]) == (len(active) - len(blocked), len(blocked)), b1
+        print(f"broadcast 1: {b1['recipient_count']} delivered, {b1['failed_count']} blocked, "
+              f"{len(counts) / elapsed:.1f} msg/s at rate {rate:g}, {fake.rejected[429]} flood-limit (429) responses waited out")
+
+        # Interrupt a second broadcast, then resume it with a new sender as after a restart
+        store.add_broadcast("b2", "Second announcement")
+        first_run = asyncio.create_task(BroadcastSender(rate=rate, batch_size=BATCH_SIZE).run_pending(bot))
+        while store.broadcasts["b2"]["last_recipient_id"] is None:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.5)
+        first_run.cancel()
+        await asyncio.gather(first_run, return_exceptions=True)
+        checkpoint = store.broadcasts["b2"]["last_recipient_id"]
+        assert store.broadcasts["b2"]["status"] == "sending"
+
+        await BroadcastSender(rate=rate, batch_size=BATCH_SIZE).run_pending(bot)
+        counts = deliveries(fake, "Second announcement")
+        repeated = sum(n - 1 for n in counts.values())
+        assert set(counts) == set(active) - blocked
+        assert repeated <= BATCH_SIZE, f"{repeated} messages repeated after resuming"
+        b2 = store.broadcasts["b2"]
+        assert b2["status"] == "sent" and b2["recipient_count"] >= len(active) - len(blocked)
+        print(f"broadcast 2: interrupted after recipient {checkpoint}, resumed and finished; "
+              f"{repeated} messages from the unfinished batch were sent again")
+    finally:
+        await bot.shutdown()
+        await fake.stop()
+
+if __name__ == "__main__":
+    asyncio.run(run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 300,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 25,
+    ))
@@ -0,0 +1,162 @@
+"""Check the cart is revalidated at final confirmation on both storage backends.
+
+Run from the repository root:
+
+    python bot/benchmarks/cart_check.py
+
+A customer puts four products in their cart and goes through checkout up to
+the order summary, on fake_supabase.FakeSupabase and on a throwaway
+SQLiteBackend. Meanwhile one product's price goes up, one is deactivated,
+and the customer's holds expire while the other two sell out or nearly.
+The check asserts that confirming shows each of those changes and a fixed
+summary, that every line was checked with one product lookup, and that
+confirming again goes on to payment with the new total, served from the
+catalog cache without another query. Then a second customer's hold expires
+before the sweeper has run while others buy the rest of the stock, and the
+check asserts their own units are released and still theirs at confirmation.
+"""
+import os
+import sys
+import asyncio
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram.ext import Application
+import metrics
+import repository
+import flood
+import telegram_bot
+from notifications import outbox
+from supabase_backend import SupabaseBackend
+from sqlite_backend import SQLiteBackend
+from fake_telegram import FakeTelegram
+from fake_supabase import FakeSupabase
+from reservation_check import Shopper
+
+logging.basicConfig(level=logging.WARNING)
+for noisy in ("httpx", "tornado.access", "telegram.ext", "telegram_bot", "catalog", "receipts", "search", "views",
+              "repository", "notifications", "supabase_backend", "sqlite_backend"):
+    logging.getLogger(noisy).setLevel(logging.ERROR)
+
+USER_ID = 800_000
+PRODUCTS = [
+    {"product_id": "CA", "name": "Tea Leaf Salad", "description": "Pickled tea leaves", "price": 1000, "stock": 10, "is_active": True},
+    {"product_id": "CB", "name": "Mohinga", "description": "Fish noodle soup", "price": 2000, "stock": 10, "is_active": True},
+    {"product_id": "CC", "name": "Shan Noodles", "description": "Rice noodles", "price": 3000, "stock": 10, "is_active": True},
+    {"product_id": "CD", "name": "Falooda", "description": "Rose milk dessert", "price": 4000, "stock": 10, "is_active": True},
+    {"product_id": "CE", "name": "Shwe Yin Aye", "description": "Coconut jelly dessert", "price": 1500, "stock": 10, "is_active": True},
+]
+CART = [("CA", 2), ("CB", 1), ("CC", 3), ("CD", 1)]
+CHECKOUT = [
+    ("press", "add_more_no"), ("message", "Aung Aung"), ("press", "name_correct"),
+    ("message", "09123456789"), ("press", "phone_correct"),
+    ("message", "12"), ("message", "Main Street"), ("message", "Ward 4"), ("message", "Kamayut"), ("message", "Yangon"),
+    ("press", "address_correct"), ("press", "delivery_express_cars"),
+]
+
+def product_queries() -> dict:
+    return {name: int(value) for (table, name), value in metrics.query_calls.values.items() if table == "products"}
+
+def queries_since(before: dict) -> dict:
+    return {name: count - before.get(name, 0) for name, count in product_queries().items() if count != before.get(name, 0)}
+
+async def check(backend_name: str):
+    telegram = FakeTelegram()
+    supabase = FakeSupabase(products=[
+        {"id": f"00000000-0000-0000-0000-{i:012d}", "image_url": None, **product} for i, product in enumerate(PRODUCTS, 1)
+    ])
+    await telegram.start()
+    await supabase.start()
+    if backend_name == "sqlite":
+        backend = SQLiteBackend(os.path.join(tempfile.mkdtemp(), "shop.db"))
+        backend.upsert_products([dict(product) for product in PRODUCTS])
+    else:
+        backend = SupabaseBackend(supabase.url, "cart-check-key")
+    repository.configure(backend)
+    outbox.path = os.path.join(tempfile.mkdtemp(), "outbox.db")
+    flood.control.configure(0, 0, 0, 0)
+    telegram_bot.catalog.invalidate()
+
+    def stock(product_id: str) -> int:
+        if backend_name == "sqlite":
+            return backend._connection.execute("SELECT stock FROM products WHERE product_id = ?", (product_id,)).fetchone()[0]
+        return next(row for row in supabase.tables["products"] if row["product_id"] == product_id)["stock"]
+
+    # Put the cart in and go through checkout up to the order summary
+    async def checkout(user_id: int, cart: list) -> str:
+        for i, (product_id, quantity) in enumerate(cart):
+            await shopper.press(user_id, f"order_{product_id}")
+            text, _ = await shopper.message(user_id, str(quantity))
+            assert text.startswith("✅ Added"), text
+            if i < len(cart) - 1:
+                await shopper.press(user_id, "add_more_yes")
+        for kind, payload in CHECKOUT:
+            text, _ = await getattr(shopper, kind)(user_id, payload)
+        return text
+
+    # What the admin panel does while the customer is checking out
+    def update_product(product_id: str, changes: dict):
+        if backend_name == "sqlite":
+            assignments = ", ".join(f"{column} = ?" for column in changes)
+            backend._connection.execute(f"UPDATE products SET {assignments} WHERE product_id = ?", (*changes.values(), product_id))
+        else:
+            next(row for row in supabase.tables["products"] if row["product_id"] == product_id).update(changes)
+
+    application = telegram_bot.build_application(Application.builder().token("123:LOCAL").base_url(telegram.base_url))
+    shopper = Shopper(application, telegram)
+    await application.initialize()
+    await telegram_bot.post_init(application)
+    await application.start()
+    try:
+        text = await checkout(USER_ID, CART)
+        assert "ORDER SUMMARY" in text and "Total Cost:* 17000.00" in text, text
+
+        update_product("CA", {"price": 1200})
+        update_product("CB", {"is_active": False})
+        # The customer's holds run out and are swept back, then others buy most of it
+        application.user_data[USER_ID]["reserved_until"] = 0
+        await repository.release_reservations(USER_ID)
+        update_product("CC", {"stock": 1})
+        update_product("CD", {"stock": 0})
+        telegram_bot.catalog.invalidate()
+
+        before = product_queries()
+        text, buttons = await shopper.press(USER_ID, "final_confirm_yes")
+        assert queries_since(before) == {"get_products": 1}, queries_since(before)
+        for change in ("Tea Leaf Salad now costs 1200.00 (was 1000.00)", "Mohinga is no longer available and was removed",
+                       "Only 1 Shan Noodles left, quantity changed from 3 to 1", "Falooda has sold out and was removed"):
+            assert change in text, f"{change!r} not in {text!r}"
+        assert "Total Cost:* 5400.00" in text and "final_confirm_yes" in buttons, text
+        print(f"{backend_name}: confirming showed 4 changes to a 4-line cart and the new total, "
+              f"checked with 1 product query")
+
+        before = product_queries()
+        text, _ = await shopper.press(USER_ID, "final_confirm_yes")
+        assert "Total Amount: 5400.00" in text, text
+        assert queries_since(before) == {}, queries_since(before)
+        print(f"{backend_name}: confirming again went on to payment, cart checked from the catalog cache")
+
+        # The hold has run out but the sweeper has not been round yet, and others bought the rest
+        text = await checkout(USER_ID + 1, [("CE", 2)])
+        assert "Total Cost:* 3000.00" in text, text
+        application.user_data[USER_ID + 1]["reserved_until"] = 0
+        update_product("CE", {"stock": 0})
+        text, _ = await shopper.press(USER_ID + 1, "final_confirm_yes")
+        assert "Total Amount: 3000.00" in text, text
+        assert stock("CE") == 2, stock("CE")
+        print(f"{backend_name}: an expired hold not yet swept was released at confirmation and the units kept")
+    finally:
+        await application.stop()
+        await telegram_bot.post_shutdown(application)
+        await application.shutdown()
+        await supabase.stop()
+        await telegram.stop()
+
+async def run():
+    for backend_name in ("supabase", "sqlite"):
+        await check(backend_name)
+
+if __name__ == "__main__":
+    asyncio.run(run())
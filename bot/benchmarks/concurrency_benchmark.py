@@ -0,0 +1,106 @@
+"""Throughput of sequential vs. per-user concurrent update processing.
+
+Run from the repository root:
+
+    python bot/benchmarks/concurrency_benchmark.py [users ...]
+
+For each number of simultaneous users (default 1 10 50 200), runs the
+load_test.py order conversation against fake Supabase with its default
+latencies, once handling updates one at a time and once with
+update_processor.PerUserUpdateProcessor, and prints updates per second and
+p95 checkout latency for both. Each run checks every user placed exactly
+one order. A last run has every user send all their steps at once, without
+waiting for replies, which only completes if each user's updates are still
+handled in order. Finally one user queues 300 updates that take 50 ms each
+and another user sends one; the check asserts the second user is answered
+at once rather than after the backlog, and the backlog in order.
+
+The fakes run in the same process as the bot and share its CPU, so beyond a
+few dozen users throughput is bounded by the benchmark itself. The real Bot
+API and Supabase are slower than the fakes, so there is more waiting for
+concurrency to overlap in production.
+"""
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update
+from telegram.ext import Application, TypeHandler
+import load_test
+from fake_telegram import FakeTelegram
+from update_processor import PerUserUpdateProcessor
+
+CONCURRENT_UPDATES = 256
+BACKLOG = 300
+BACKLOG_DELAY = 0.05
+
+def message(update_id: int, user_id: int) -> dict:
+    return {"update_id": update_id, "message": {
+        "message_id": update_id, "date": int(time.time()), "chat": {"id": user_id, "type": "private"}, "text": "hi",
+        "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+    }}
+
+# Seconds until a second user's update is handled while the first has a backlog queued
+async def backlog_latency() -> float:
+    telegram = FakeTelegram()
+    await telegram.start()
+    handled = []
+    answered = asyncio.Event()
+
+    async def handle(update: Update, context):
+        if update.effective_user.id == 2:
+            answered.set()
+            return
+        await asyncio.sleep(BACKLOG_DELAY)
+        handled.append(update.update_id)
+
+    application = (Application.builder().token("123:LOCAL").base_url(telegram.base_url)
+                   .concurrent_updates(PerUserUpdateProcessor(CONCURRENT_UPDATES)).build())
+    application.add_handler(TypeHandler(Update, handle))
+    await application.initialize()
+    await application.start()
+    try:
+        for update_id in range(1, BACKLOG + 1):
+            await application.update_queue.put(Update.de_json(message(update_id, 1), application.bot))
+        start = time.perf_counter()
+        await application.update_queue.put(Update.de_json(message(BACKLOG + 1, 2), application.bot))
+        await answered.wait()
+        latency = time.perf_counter() - start
+    finally:
+        # Stopping waits for the backlog to be worked through
+        await application.stop()
+        await application.shutdown()
+        await telegram.stop()
+    assert handled == list(range(1, BACKLOG + 1)), "backlog handled out of order"
+    return latency
+
+async def measure(users: int, concurrent_updates: int, eager: bool = False) -> tuple[float, float]:
+    args = load_test.parse_args([
+        "--users", str(users), "--concurrency", str(users), "--concurrent-updates", str(concurrent_updates),
+    ] + (["--eager"] if eager else []))
+    harness, elapsed, _ = await load_test.simulate(args)
+    return harness.updates_sent / elapsed, load_test.percentile(harness.latencies["payment_photo"], 95)
+
+async def run(user_counts: list):
+    print(f"{'users':>6}{'sequential upd/s':>18}{'p95 checkout':>14}{'per-user upd/s':>16}{'p95 checkout':>14}{'speed-up':>10}")
+    for users in user_counts:
+        sequential, sequential_p95 = await measure(users, 1)
+        concurrent, concurrent_p95 = await measure(users, CONCURRENT_UPDATES)
+        print(f"{users:>6}{sequential:>18.1f}{sequential_p95 * 1000:>11.0f} ms{concurrent:>16.1f}"
+              f"{concurrent_p95 * 1000:>11.0f} ms{concurrent / sequential:>9.1f}x")
+
+    users = max(user_counts)
+    throughput, _ = await measure(users, CONCURRENT_UPDATES, eager=True)
+    print(f"{users} users sending every step at once: all orders placed in order ({throughput:.1f} updates/s)")
+
+    latency = await backlog_latency()
+    assert latency < 0.5, f"a backlog from one user held up another for {latency:.2f}s"
+    print(f"one user with {BACKLOG} updates of {BACKLOG_DELAY * 1000:.0f} ms queued: "
+          f"another user answered in {latency * 1000:.0f} ms, backlog handled in order")
+
+if __name__ == "__main__":
+    asyncio.run(run([int(value) for value in sys.argv[1:]] or [1, 10, 50, 200]))
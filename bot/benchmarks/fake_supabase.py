@@ -0,0 +1,300 @@
+"""Minimal in-process stand-in for the Supabase REST (PostgREST) API.
+
+Point the repository at it with
+repository.configure(SupabaseBackend(fake.url, "any-key")).
+Tables are plain lists of dicts in `FakeSupabase.tables`. Only what the bot
+sends is modelled: column selection, the eq/neq/gt/gte/lt/lte/in/is filters
+(and not.*, and or=(...) groups with nested and(...)), order, limit/offset, exact counts, inserts, filtered updates
+and the place_order and stock reservation functions. Every request waits `latency` seconds first,
+to stand in for the network round trip to the database.
+"""
+import json
+import asyncio
+import itertools
+from datetime import datetime, timedelta, timezone
+from tornado.web import Application, RequestHandler
+from tornado.httpserver import HTTPServer
+from tornado.netutil import bind_sockets
+
+FUNCTIONS = {"place_order", "reserve_stock", "release_reservations", "release_expired_reservations"}
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns", "or", "and"}
+
+def sample_products(count: int = 12) -> list:
+    return [
+        {
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "product_id": f"P{i:02d}",
+            "name": f"Product {i}",
+            "description": f"Description of product {i}",
+            "price": 1000 + 250 * i,
+            "stock": 1_000_000,
+            "image_url": None,
+            "is_active": True,
+        }
+        for i in range(1, count + 1)
+    ]
+
+# PostgREST compares against the text form of a value
+def _as_text(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+def _compare(value, operator: str, operand: str) -> bool:
+    if operator == "is":
+        return _as_text(value) == operand
+    if operator == "in":
+        return _as_text(value) in [item.strip('"') for item in operand.strip("()").split(",")]
+    if value is None:
+        return False
+    if operator == "eq":
+        return _as_text(value) == operand
+    if operator == "neq":
+        return _as_text(value) != operand
+    try:
+        left, right = float(value), float(operand)
+    except (TypeError, ValueError):
+        left, right = _as_text(value), operand
+    return {"gt": left > right, "gte": left >= right, "lt": left < right, "lte": left <= right}[operator]
+
+# Split 'a.eq.1,and(b.eq.2,c.lt."x,y")' at the commas outside parentheses and quotes
+def _split_terms(text: str) -> list:
+    terms, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            terms.append(current)
+            current = ""
+            continue
+        current += char
+    return terms + [current]
+
+# Evaluate one or=/and= group, e.g. "(a.lt.1,and(a.eq.1,b.lt.2))", against a row
+def _matches_group(row: dict, operator: str, body: str) -> bool:
+    results = []
+    for term in _split_terms(body.strip()[1:-1]):
+        if term.startswith(("and(", "or(")):
+            name, _, rest = term.partition("(")
+            results.append(_matches_group(row, name, "(" + rest))
+        else:
+            column, _, expression = term.partition(".")
+            operator_name, _, operand = expression.partition(".")
+            results.append(_matches(row, [(column, f"{operator_name}.{operand.strip(chr(34))}")]))
+    return any(results) if operator == "or" else all(results)
+
+def _matches(row: dict, filters: list) -> bool:
+    for column, expression in filters:
+        negate = expression.startswith("not.")
+        operator, _, operand = expression.removeprefix("not.").partition(".")
+        if _compare(row.get(column), operator, operand) == negate:
+            return False
+    return True
+
+class FakeSupabase:
+    def __init__(self, latency: float = 0.0, products: list | None = None):
+        self.latency = latency
+        self.requests = 0
+        self.tables = {
+            "products": products if products is not None else sample_products(),
+            "profiles": [],
+            "orders": [],
+            "broadcast_messages": [],
+            "stock_reservations": [],
+        }
+        self.port = None
+        self._server = None
+        self._ids = itertools.count(1)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self):
+        sockets = bind_sockets(0, "127.0.0.1")
+        self.port = sockets[0].getsockname()[1]
+        self._server = HTTPServer(Application([
+            (r"/rest/v1/rpc/(\w+)", _RpcHandler, {"fake": self}),
+            (r"/rest/v1/(\w+)", _TableHandler, {"fake": self}),
+        ]))
+        self._server.add_sockets(sockets)
+
+    async def stop(self):
+        self._server.stop()
+        await self._server.close_all_connections()
+
+    # Functions
+
+    # Remove the reservations `taken` picks and return their quantities per product_id
+    def _take_holds(self, taken) -> dict:
+        held, kept = {}, []
+        for hold in self.tables["stock_reservations"]:
+            if taken(hold):
+                held[hold["product_id"]] = held.get(hold["product_id"], 0) + hold["quantity"]
+            else:
+                kept.append(hold)
+        self.tables["stock_reservations"] = kept
+        return held
+
+    def _return_holds(self, held: dict):
+        for product in self.tables["products"]:
+            product["stock"] += held.get(product["product_id"], 0)
+
+    def reserve_stock(self, params: dict):
+        expires_at = (datetime.now(timezone.utc) + timedelta(seconds=params["_ttl_seconds"])).isoformat()
+        for hold in self.tables["stock_reservations"]:
+            if hold["telegram_user_id"] == params["_telegram_user_id"]:
+                hold["expires_at"] = expires_at
+        product = next((row for row in self.tables["products"] if row["product_id"] == params["_product_id"]), None)
+        if not product or not product["is_active"] or product["stock"] < params["_quantity"]:
+            return 400, {"code": "P0001", "message": "out_of_stock", "details": params["_product_id"], "hint": None}
+        product["stock"] -= params["_quantity"]
+        hold = {
+            "id": next(self._ids),
+            "telegram_user_id": params["_telegram_user_id"],
+            "product_id": params["_product_id"],
+            "quantity": params["_quantity"],
+            "expires_at": expires_at,
+        }
+        self.tables["stock_reservations"].append(hold)
+        return 200, {"id": hold["id"], "expires_at": expires_at}
+
+    def release_reservations(self, params: dict):
+        before = len(self.tables["stock_reservations"])
+        self._return_holds(self._take_holds(lambda hold: hold["telegram_user_id"] == params["_telegram_user_id"]))
+        return 200, before - len(self.tables["stock_reservations"])
+
+    def release_expired_reservations(self, params: dict):
+        now = datetime.now(timezone.utc).isoformat()
+        expired = sorted(
+            (hold for hold in self.tables["stock_reservations"] if hold["expires_at"] <= now),
+            key=lambda hold: hold["expires_at"]
+        )[:params["_batch_size"]]
+        ids = {hold["id"] for hold in expired}
+        self._return_holds(self._take_holds(lambda hold: hold["id"] in ids))
+        return 200, len(ids)
+
+    def place_order(self, params: dict):
+        quantities = {}
+        for item in params["_items"]:
+            quantities[item["product_id"]] = quantities.get(item["product_id"], 0) + item["quantity"]
+        user_id = params["_telegram_user_id"]
+        held = {
+            product_id: sum(hold["quantity"] for hold in self.tables["stock_reservations"]
+                            if hold["telegram_user_id"] == user_id and hold["product_id"] == product_id)
+            for product_id in quantities
+        }
+        needed = {product_id: quantity - held[product_id] for product_id, quantity in quantities.items()}
+        products = {row["product_id"]: row for row in self.tables["products"]}
+        for product_id in sorted(quantities):
+            product = products.get(product_id)
+            if not product or not product["is_active"] or product["stock"] < needed[product_id]:
+                return 400, {"code": "P0001", "message": "out_of_stock", "details": product_id, "hint": None}
+        if any(order["order_string"] == params["_order_string"] for order in self.tables["orders"]):
+            return 409, {"code": "23505", "message": "duplicate key value violates unique constraint", "details": None, "hint": None}
+        self._take_holds(lambda hold: hold["telegram_user_id"] == user_id and hold["product_id"] in quantities)
+        for product_id, quantity in needed.items():
+            products[product_id]["stock"] -= quantity
+        items = [{**item, "price": products[item["product_id"]]["price"]} for item in params["_items"]]
+        total_cost = sum(item["quantity"] * item["price"] for item in items)
+        self.tables["orders"].append({
+            "id": next(self._ids),
+            "order_string": params["_order_string"],
+            "telegram_user_id": params["_telegram_user_id"],
+            "user_name": params["_user_name"],
+            "phone": params["_phone"],
+            "address": params["_address"],
+            "items": items,
+            "total_cost": total_cost,
+            "delivery_type": params["_delivery_type"],
+            "status": "pending",
+            "receipt_file_id": None,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        })
+        profiles = self.tables["profiles"]
+        profile = next((p for p in profiles if p["telegram_user_id"] == params["_telegram_user_id"]), None)
+        if profile is None:
+            profiles.append({"telegram_user_id": params["_telegram_user_id"], "is_banned": False})
+            profile = profiles[-1]
+        profile.update(username=params["_username"], phone=params["_phone"])
+        return 200, {"order_string": params["_order_string"], "total_cost": total_cost, "items": items}
+
+class _FakeHandler(RequestHandler):
+    def initialize(self, fake: FakeSupabase):
+        self.fake = fake
+
+    async def prepare(self):
+        self.fake.requests += 1
+        if self.fake.latency:
+            await asyncio.sleep(self.fake.latency)
+
+    def reply(self, status: int, body):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(body, default=str))
+
+class _RpcHandler(_FakeHandler):
+    def post(self, function: str):
+        if function not in FUNCTIONS:
+            self.reply(404, {"code": "PGRST202", "message": f"Could not find the function public.{function}", "details": None, "hint": None})
+            return
+        self.reply(*getattr(self.fake, function)(json.loads(self.request.body)))
+
+class _TableHandler(_FakeHandler):
+    def _rows(self, table: str) -> list:
+        filters = [
+            (name, values[-1].decode())
+            for name, values in self.request.query_arguments.items()
+            if name not in RESERVED_PARAMS
+        ]
+        groups = [
+            (name, values[-1].decode())
+            for name, values in self.request.query_arguments.items()
+            if name in ("or", "and")
+        ]
+        return [
+            row for row in self.fake.tables.setdefault(table, [])
+            if _matches(row, filters) and all(_matches_group(row, name, body) for name, body in groups)
+        ]
+
+    def _project(self, rows: list) -> list:
+        select = self.get_query_argument("select", "*")
+        if select == "*":
+            return [dict(row) for row in rows]
+        columns = select.split(",")
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+    def get(self, table: str):
+        rows = self._rows(table)
+        order = self.get_query_argument("order", None)
+        if order:
+            for term in reversed(order.split(",")):
+                column, _, direction = term.partition(".")
+                rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=direction.startswith("desc"))
+        total = len(rows)
+        offset = int(self.get_query_argument("offset", "0"))
+        limit = self.get_query_argument("limit", None)
+        rows = rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+        if "count=exact" in self.request.headers.get("Prefer", ""):
+            self.set_header("Content-Range", f"{offset}-{offset + len(rows) - 1}/{total}" if rows else f"*/{total}")
+        self.reply(200, self._project(rows))
+
+    def post(self, table: str):
+        body = json.loads(self.request.body)
+        rows = body if isinstance(body, list) else [body]
+        self.fake.tables.setdefault(table, []).extend(rows)
+        self.reply(201, self._project(rows) if "return=representation" in self.request.headers.get("Prefer", "") else [])
+
+    def patch(self, table: str):
+        changes = json.loads(self.request.body)
+        rows = self._rows(table)
+        for row in rows:
+            row.update(changes)
+        self.reply(200, self._project(rows) if "return=representation" in self.request.headers.get("Prefer", "") else [])
@@ -0,0 +1,138 @@
+"""Minimal in-process stand-in for the Telegram Bot API.
+
+Point an Application at it with ApplicationBuilder.base_url() and every Bot
+API call is answered locally and recorded in `FakeTelegram.calls`, so the
+bot can be driven offline. Only the methods the bot uses are modelled.
+
+`rate_limit` makes sendMessage answer 429 with retry_after once more than that
+many messages were sent in the last second, and chats in `blocked_chats`
+answer 403 as if the user had blocked the bot. `failure_rate` makes that share
+of send calls fail with 502 Bad Gateway, which the bot sees as a network error.
+`on_call`, if set, is called with (method, params) for every successful call.
+Like Telegram, only the first answerCallbackQuery for a callback query
+succeeds; `callback_answers` counts them all per callback query id.
+"""
+import json
+import time
+import random
+import asyncio
+import itertools
+import collections
+from tornado.web import Application, RequestHandler
+from tornado.httpserver import HTTPServer
+from tornado.netutil import bind_sockets
+
+BOT_USER = {"id": 1000, "is_bot": True, "first_name": "Order Bot", "username": "order_test_bot"}
+
+class FakeTelegram:
+    def __init__(self, latency: float = 0.0, rate_limit: int | None = None, blocked_chats=(), failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.on_call = None
+        self.rate_limit = rate_limit
+        self.blocked_chats = {str(chat_id) for chat_id in blocked_chats}
+        self.rejected = collections.Counter()
+        # Every answerCallbackQuery call per callback query id, including rejected repeats
+        self.callback_answers = collections.Counter()
+        self._recent_sends = collections.deque()
+        self.calls = []
+        self.port = None
+        self._server = None
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/bot"
+
+    async def start(self):
+        sockets = bind_sockets(0, "127.0.0.1")
+        self.port = sockets[0].getsockname()[1]
+        self._server = HTTPServer(Application([(r"/bot[^/]+/(\w+)", _MethodHandler, {"fake": self})]))
+        self._server.add_sockets(sockets)
+
+    async def stop(self):
+        self._server.stop()
+        await self._server.close_all_connections()
+
+    def calls_to(self, method: str) -> list:
+        return [params for name, params in self.calls if name == method]
+
+    def _message(self, params: dict) -> dict:
+        chat_id = params.get("chat_id", 0)
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id) if str(chat_id).lstrip("-").isdigit() else 0, "type": "private"},
+            "from": BOT_USER,
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        return message
+
+    # An error response for this call, or None if it succeeds
+    def error(self, method: str, params: dict) -> dict | None:
+        if method == "answerCallbackQuery":
+            self.callback_answers[params["callback_query_id"]] += 1
+            if self.callback_answers[params["callback_query_id"]] > 1:
+                return {"error_code": 400, "description": "Bad Request: query is too old and response timeout expired or query ID is invalid"}
+            return None
+        if not method.startswith("send"):
+            return None
+        if self.failure_rate and random.random() < self.failure_rate:
+            return {"error_code": 502, "description": "Bad Gateway"}
+        if method != "sendMessage":
+            return None
+        if str(params.get("chat_id")) in self.blocked_chats:
+            return {"error_code": 403, "description": "Forbidden: bot was blocked by the user"}
+        if self.rate_limit:
+            now = time.monotonic()
+            while self._recent_sends and self._recent_sends[0] <= now - 1.0:
+                self._recent_sends.popleft()
+            if len(self._recent_sends) >= self.rate_limit:
+                return {"error_code": 429, "description": "Too Many Requests: retry after 1", "parameters": {"retry_after": 1}}
+            self._recent_sends.append(now)
+        return None
+
+    def answer(self, method: str, params: dict):
+        if method == "getMe":
+            return BOT_USER
+        if method in ("sendMessage", "editMessageText", "sendPhoto"):
+            return self._message(params)
+        if method == "sendDocument":
+            message = self._message(params)
+            file_number = next(self._file_ids)
+            message["document"] = {"file_id": f"file-{file_number}", "file_unique_id": f"unique-{file_number}"}
+            return message
+        # setWebhook, deleteWebhook, answerCallbackQuery, answerInlineQuery, ...
+        return True
+
+class _MethodHandler(RequestHandler):
+    def initialize(self, fake: FakeTelegram):
+        self.fake = fake
+
+    async def post(self, method: str):
+        params = {name: values[-1].decode() for name, values in self.request.body_arguments.items()}
+        if self.request.headers.get("Content-Type", "").startswith("application/json") and self.request.body:
+            params.update(json.loads(self.request.body))
+        for name in self.request.files:
+            params[name] = "<upload>"
+        if self.fake.latency:
+            try:
+                await asyncio.sleep(self.fake.latency)
+            except asyncio.CancelledError:
+                # The server is being stopped with this request in flight
+                return
+        # Rejected calls are counted in `rejected`; `calls` only holds the ones that succeeded
+        error = self.fake.error(method, params)
+        if error:
+            self.fake.rejected[error["error_code"]] += 1
+            self.set_status(error["error_code"])
+            self.write({"ok": False, **error})
+            return
+        self.fake.calls.append((method, params))
+        if self.fake.on_call:
+            self.fake.on_call(method, params)
+        self.write({"ok": True, "result": self.fake.answer(method, params)})
+
+    get = post
@@ -0,0 +1,148 @@
+"""Check flood control against one user hammering a button, fully offline.
+
+Run from the repository root:
+
+    python bot/benchmarks/flood_check.py [presses] [users]
+
+Builds the real application against fake_telegram.FakeTelegram and a
+throwaway SQLiteBackend. One scripted user presses "Next ➡️" `presses`
+times as fast as the bot takes updates, while `users` ordinary users each
+browse a few pages at a human pace. The check asserts that every press is
+answered (the excess ones with the slow-down toast, without reaching any
+handler), that the scripted user gets no more pages than their bucket
+allows, and that every ordinary user's click is served. A second round
+shrinks the bot-wide bucket and checks it caps all users together.
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import itertools
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update
+from telegram.ext import Application
+import flood
+import metrics
+import repository
+import telegram_bot
+from notifications import outbox
+from sqlite_backend import SQLiteBackend
+from fake_telegram import FakeTelegram, BOT_USER
+
+logging.basicConfig(level=logging.WARNING)
+for noisy in ("httpx", "tornado.access", "telegram.ext", "telegram_bot", "search", "sqlite_backend", "repository", "catalog", "views"):
+    logging.getLogger(noisy).setLevel(logging.ERROR)
+
+SCRIPTED_USER_ID = 500_000
+FIRST_USER_ID = 500_001
+USER_RATE = 1.0
+USER_BURST = 10
+CLICK_INTERVAL = 1.0
+
+def products(count: int) -> list:
+    return [
+        {"product_id": f"P{i:03d}", "name": f"Product {i}", "description": f"Sample product number {i}", "price": 1000 + 10 * i, "stock": 10}
+        for i in range(1, count + 1)
+    ]
+
+class Clicker:
+    def __init__(self, application: Application, telegram: FakeTelegram):
+        self.application = application
+        self.telegram = telegram
+        self.ids = itertools.count(1)
+
+    async def press(self, user_id: int, data: str) -> str:
+        query_id = str(next(self.ids))
+        chat = {"id": user_id, "type": "private"}
+        await self.application.update_queue.put(Update.de_json({"update_id": int(query_id), "callback_query": {
+            "id": query_id, "chat_instance": "1", "data": data,
+            "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+            "message": {"message_id": 1, "date": int(time.time()), "chat": chat, "from": BOT_USER, "text": "..."},
+        }}, self.application.bot))
+        return query_id
+
+    def answers(self) -> dict:
+        return {params["callback_query_id"]: params for params in self.telegram.calls_to("answerCallbackQuery")}
+
+    def pages_sent(self, user_id: int) -> int:
+        return sum(str(params.get("chat_id")) == str(user_id) for params in self.telegram.calls_to("editMessageText"))
+
+    async def wait_answered(self, query_ids: list, timeout: float = 30.0):
+        deadline = time.perf_counter() + timeout
+        while not set(query_ids) <= self.answers().keys():
+            if time.perf_counter() > deadline:
+                raise AssertionError(f"{len(set(query_ids) - self.answers().keys())} presses were not answered")
+            await asyncio.sleep(0.01)
+
+async def browse(clicker: Clicker, user_id: int, pages: int) -> list:
+    sent = []
+    for page in range(pages):
+        sent.append(await clicker.press(user_id, f"browse_products_{page}"))
+        await asyncio.sleep(CLICK_INTERVAL)
+    return sent
+
+def throttled(limit: str) -> int:
+    return int(metrics.updates_throttled.values.get((limit,), 0))
+
+async def run(press_count: int, user_count: int):
+    telegram = FakeTelegram()
+    await telegram.start()
+    backend = SQLiteBackend(os.path.join(tempfile.mkdtemp(), "shop.db"))
+    backend.upsert_products(products(40))
+    repository.configure(backend)
+    outbox.path = os.path.join(tempfile.mkdtemp(), "outbox.db")
+    flood.control.configure(USER_RATE, USER_BURST, 0, 0)
+
+    application = telegram_bot.build_application(Application.builder().token("123:LOCAL").base_url(telegram.base_url))
+    clicker = Clicker(application, telegram)
+    await application.initialize()
+    await telegram_bot.post_init(application)
+    await application.start()
+    try:
+        start = time.perf_counter()
+        users = range(FIRST_USER_ID, FIRST_USER_ID + user_count)
+        async def hammer() -> list:
+            return [await clicker.press(SCRIPTED_USER_ID, "browse_products_1") for _ in range(press_count)]
+        scripted, *browsed = await asyncio.gather(hammer(), *(browse(clicker, user_id, 4) for user_id in users))
+        await clicker.wait_answered(scripted + [query_id for sent in browsed for query_id in sent])
+        elapsed = time.perf_counter() - start
+
+        answers = clicker.answers()
+        toasts = sum(answers[query_id].get("text") == telegram_bot.SLOW_DOWN for query_id in scripted)
+        served = sum(not answers[query_id].get("text") for query_id in scripted)
+        allowed = USER_BURST + USER_RATE * elapsed
+        assert served + toasts == press_count, (served, toasts)
+        assert served <= allowed, f"{served} pages served, bucket allows {allowed:.0f}"
+        assert throttled("user") == toasts
+        print(f"scripted user: {press_count} presses in {elapsed:.2f}s, {served} pages served, "
+              f"{toasts} answered with the slow-down toast")
+
+        for user_id, sent in zip(users, browsed):
+            assert clicker.pages_sent(user_id) == len(sent), f"user {user_id} was throttled"
+            assert not any(answers[query_id].get("text") for query_id in sent)
+        print(f"{user_count} users clicking once a second: all {user_count * 4} clicks served")
+
+        # Bot-wide bucket: a burst of 20 shared by many users pressing once each
+        flood.control.configure(0, 0, 1, 20)
+        sent = [await clicker.press(user_id, "browse_products_0") for user_id in range(600_000, 600_050)]
+        await clicker.wait_answered(sent)
+        # A served press is answered before its page is edited in, so count answers, not edits
+        answers = clicker.answers()
+        served = sum(answers[query_id].get("text") != telegram_bot.SLOW_DOWN for query_id in sent)
+        assert 20 <= served <= 22, served
+        assert throttled("global") == 50 - served
+        print(f"bot-wide limit: 50 users pressing at once, {served} served, {50 - served} told to slow down")
+    finally:
+        await application.stop()
+        await telegram_bot.post_shutdown(application)
+        await application.shutdown()
+        await telegram.stop()
+
+if __name__ == "__main__":
+    press_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    user_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    asyncio.run(run(press_count, user_count))
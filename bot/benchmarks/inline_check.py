@@ -0,0 +1,146 @@
+"""Check inline mode: debouncing, pagination and deep links, fully offline.
+
+Run from the repository root:
+
+    python bot/benchmarks/inline_check.py [users] [products]
+
+Builds the real application against fake_telegram.FakeTelegram and a
+throwaway SQLiteBackend holding `products` products. Each of `users` users
+types a query one keystroke at a time ("p", "pr", "pro", ...), 60 ms apart,
+as Telegram sends them. The check asserts that each user gets exactly one
+answerInlineQuery (for the full query), that storage sees at most one
+query per user (the cached ban check) rather than one per keystroke, and
+that following next_offset pages through every product once, with result
+buttons deep-linking into /start.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import itertools
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update
+from telegram.ext import Application
+import metrics
+import repository
+import telegram_bot
+from notifications import outbox
+from sqlite_backend import SQLiteBackend
+from fake_telegram import FakeTelegram, BOT_USER
+
+logging.basicConfig(level=logging.WARNING)
+for noisy in ("httpx", "tornado.access", "telegram.ext", "telegram_bot", "search", "sqlite_backend", "repository", "catalog", "receipts"):
+    logging.getLogger(noisy).setLevel(logging.ERROR)
+
+FIRST_USER_ID = 300_000
+KEYSTROKE_INTERVAL = 0.06
+
+def products(count: int) -> list:
+    return [
+        {"product_id": f"P{i:03d}", "name": f"Product {i}", "description": f"Sample product number {i}", "price": 1000 + 10 * i, "stock": 10}
+        for i in range(1, count + 1)
+    ]
+
+def storage_queries() -> int:
+    return int(sum(metrics.query_calls.values.values()))
+
+class InlineClient:
+    def __init__(self, application: Application, telegram: FakeTelegram):
+        self.application = application
+        self.telegram = telegram
+        self.ids = itertools.count(1)
+
+    async def send(self, user_id: int, text: str, offset: str = "") -> str:
+        query_id = str(next(self.ids))
+        data = {"update_id": int(query_id), "inline_query": {
+            "id": query_id, "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+            "query": text, "offset": offset,
+        }}
+        await self.application.update_queue.put(Update.de_json(data, self.application.bot))
+        return query_id
+
+    def answers(self) -> dict:
+        return {params["inline_query_id"]: params for params in self.telegram.calls_to("answerInlineQuery")}
+
+    async def wait_answer(self, query_id: str, timeout: float = 10.0) -> dict:
+        deadline = time.perf_counter() + timeout
+        while query_id not in self.answers():
+            if time.perf_counter() > deadline:
+                raise AssertionError(f"inline query {query_id} was not answered")
+            await asyncio.sleep(0.01)
+        return self.answers()[query_id]
+
+async def type_query(client: InlineClient, user_id: int, text: str) -> list:
+    sent = []
+    for length in range(1, len(text) + 1):
+        sent.append(await client.send(user_id, text[:length]))
+        await asyncio.sleep(KEYSTROKE_INTERVAL)
+    return sent
+
+async def run(user_count: int, product_count: int):
+    telegram = FakeTelegram()
+    await telegram.start()
+    backend = SQLiteBackend(os.path.join(tempfile.mkdtemp(), "shop.db"))
+    backend.upsert_products(products(product_count))
+    repository.configure(backend)
+    outbox.path = os.path.join(tempfile.mkdtemp(), "outbox.db")
+
+    application = telegram_bot.build_application(Application.builder().token("123:LOCAL").base_url(telegram.base_url))
+    client = InlineClient(application, telegram)
+    await application.initialize()
+    await telegram_bot.post_init(application)
+    await application.start()
+    try:
+        users = range(FIRST_USER_ID, FIRST_USER_ID + user_count)
+        queries_before = storage_queries()
+        start = time.perf_counter()
+        typed = await asyncio.gather(*(type_query(client, user_id, "product 1") for user_id in users))
+        for sent in typed:
+            await client.wait_answer(sent[-1])
+        await asyncio.sleep(telegram_bot.INLINE_DEBOUNCE * 2)
+        elapsed = time.perf_counter() - start
+
+        answers = client.answers()
+        keystrokes = sum(len(sent) for sent in typed)
+        for sent in typed:
+            answered = [query_id for query_id in sent if query_id in answers]
+            assert answered == [sent[-1]], f"answered {answered} of {sent}"
+        queries = storage_queries() - queries_before
+        assert queries <= user_count, f"{queries} storage queries for {keystrokes} keystrokes"
+        print(f"{user_count} users typed {keystrokes} keystrokes in {elapsed:.2f}s: "
+              f"{len(answers)} answers sent, {queries} storage queries (ban status, once per user)")
+
+        first = json.loads(answers[typed[0][-1]]["results"])
+        assert first[0]["id"] == "P001", first[0]
+        button = first[0]["reply_markup"]["inline_keyboard"][0][0]
+        assert button["url"] == f"https://t.me/{BOT_USER['username']}?start=P001", button
+        print(f"top result for \"product 1\": {first[0]['title']}, button {button['url']}")
+
+        seen = []
+        offset = ""
+        pages = 0
+        while True:
+            answer = await client.wait_answer(await client.send(FIRST_USER_ID, "", offset))
+            seen += [result["id"] for result in json.loads(answer["results"])]
+            pages += 1
+            offset = answer.get("next_offset", "")
+            if not offset:
+                break
+        assert seen == sorted(product["product_id"] for product in products(product_count)), seen
+        print(f"empty query paged through {len(seen)} products in {pages} answers, "
+              f"cache_time {answer['cache_time']}s")
+    finally:
+        await application.stop()
+        await telegram_bot.post_shutdown(application)
+        await application.shutdown()
+        await telegram.stop()
+
+if __name__ == "__main__":
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    product_count = int(sys.argv[2]) if len(sys.argv) > 2 else 45
+    asyncio.run(run(user_count, product_count))
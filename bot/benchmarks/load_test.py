@@ -0,0 +1,215 @@
+"""End-to-end load test of the order conversation, fully offline.
+
+Run from the repository root:
+
+    python bot/benchmarks/load_test.py [--users 500] [--concurrency 100]
+        [--storage supabase|sqlite] [--supabase-latency 0.02] [--telegram-latency 0.01]
+        [--concurrent-updates 256] [--eager]
+
+Builds the real application from telegram_bot.build_application() and
+replays synthetic users through the whole order conversation: /start,
+browse, product, order, quantity, name, phone, address, delivery type, final
+confirmation and payment photo. Each user sends a step only once the bot
+has answered the previous one, like a person tapping through the chat, or
+with --eager sends every step at once, which only works if the bot keeps
+each user's updates in order. --concurrent-updates sets how many updates
+the bot handles at once (1 handles them one at a time).
+Supabase is replaced by fake_supabase.FakeSupabase (or, with --storage
+sqlite, the bot uses a throwaway SQLiteBackend file) and the Bot API by
+fake_telegram.FakeTelegram, each with the given latency per request.
+
+It reports updates handled per second and p50/p95/p99 latencies for every
+step and for checkout (payment photo to "Order placed"), then checks that
+every user ended up with exactly one order. Run it before and after a
+change to telegram_bot.py to measure the change.
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import itertools
+import statistics
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update
+from telegram.ext import Application
+import repository
+import flood
+import telegram_bot
+from notifications import outbox
+from fake_telegram import FakeTelegram, BOT_USER
+from fake_supabase import FakeSupabase, sample_products
+from supabase_backend import SupabaseBackend
+from sqlite_backend import SQLiteBackend
+
+logging.basicConfig(level=logging.WARNING)
+for noisy in ("httpx", "tornado.access", "telegram.ext", "telegram_bot", "catalog", "receipts", "repository", "notifications", "supabase_backend", "sqlite_backend",
+              "search", "views"):
+    logging.getLogger(noisy).setLevel(logging.ERROR)
+
+FIRST_USER_ID = 200_000
+ADMIN_CHANNEL_ID = "-1001000000000"
+PRODUCT_ID = "P03"
+
+# (step name, kind, payload, Bot API calls that answer it)
+CONVERSATION = [
+    ("start", "command", "/start", ["sendMessage"]),
+    ("browse", "callback", "browse_products_0", ["editMessageText"]),
+    ("product", "callback", f"product_{PRODUCT_ID}", ["editMessageText"]),
+    ("order", "callback", f"order_{PRODUCT_ID}", ["editMessageText"]),
+    ("quantity", "text", "2", ["sendMessage"]),
+    ("checkout", "callback", "add_more_no", ["editMessageText"]),
+    ("name", "text", "Aung Aung", ["sendMessage"]),
+    ("name_ok", "callback", "name_correct", ["editMessageText"]),
+    ("phone", "text", "09123456789", ["sendMessage"]),
+    ("phone_ok", "callback", "phone_correct", ["editMessageText"]),
+    ("house_no", "text", "12", ["sendMessage"]),
+    ("street", "text", "Main Street", ["sendMessage"]),
+    ("ward", "text", "Ward 4", ["sendMessage"]),
+    ("township", "text", "Kamayut", ["sendMessage"]),
+    ("city", "text", "Yangon", ["sendMessage"]),
+    ("address_ok", "callback", "address_correct", ["editMessageText"]),
+    ("delivery", "callback", "delivery_express_cars", ["editMessageText"]),
+    ("confirm", "callback", "final_confirm_yes", ["editMessageText"]),
+    ("payment_photo", "photo", None, ["sendDocument", "sendMessage"]),
+]
+
+class Harness:
+    def __init__(self, application: Application):
+        self.application = application
+        self.update_ids = itertools.count(1)
+        self.replies = {}
+        self.latencies = {name: [] for name, *_ in CONVERSATION}
+        self.updates_sent = 0
+
+    # Route each Bot API call made to a chat to that user's reply queue
+    def on_call(self, method: str, params: dict):
+        chat_id = str(params.get("chat_id", ""))
+        if chat_id.isdigit() and int(chat_id) in self.replies:
+            self.replies[int(chat_id)].put_nowait(method)
+
+    def _update(self, user_id: int, kind: str, payload) -> Update:
+        user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+        chat = {"id": user_id, "type": "private"}
+        update_id = next(self.update_ids)
+        if kind == "callback":
+            data = {"callback_query": {
+                "id": str(update_id), "from": user, "chat_instance": str(user_id), "data": payload,
+                "message": {"message_id": update_id, "date": int(time.time()), "chat": chat, "from": BOT_USER, "text": "..."},
+            }}
+        else:
+            message = {"message_id": update_id, "date": int(time.time()), "chat": chat, "from": user}
+            if kind == "photo":
+                message["photo"] = [{"file_id": f"photo-{user_id}", "file_unique_id": f"photo-{user_id}", "width": 640, "height": 480}]
+            else:
+                message["text"] = payload
+                if kind == "command":
+                    message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(payload.split()[0])}]
+            data = {"message": message}
+        return Update.de_json({"update_id": update_id, **data}, self.application.bot)
+
+    async def run_user(self, user_id: int, eager: bool = False):
+        replies = self.replies[user_id] = asyncio.Queue()
+        if eager:
+            start = time.perf_counter()
+            for name, kind, payload, expected in CONVERSATION:
+                await self.application.update_queue.put(self._update(user_id, kind, payload))
+                self.updates_sent += 1
+        for name, kind, payload, expected in CONVERSATION:
+            if not eager:
+                start = time.perf_counter()
+                await self.application.update_queue.put(self._update(user_id, kind, payload))
+                self.updates_sent += 1
+            for method in expected:
+                while await asyncio.wait_for(replies.get(), timeout=60) != method:
+                    pass
+            self.latencies[name].append(time.perf_counter() - start)
+        del self.replies[user_id]
+
+def percentile(values: list, q: float) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+def report(harness: Harness, elapsed: float):
+    print(f"{harness.updates_sent} updates in {elapsed:.2f}s: {harness.updates_sent / elapsed:.1f} updates/s")
+    print(f"{'step':<15}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, values in harness.latencies.items():
+        print(f"{name:<15}{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}{percentile(values, 99) * 1000:>10.1f}")
+    checkout = harness.latencies["payment_photo"]
+    print(f"checkout latency: p50 {percentile(checkout, 50) * 1000:.1f} ms, "
+          f"p95 {percentile(checkout, 95) * 1000:.1f} ms, p99 {percentile(checkout, 99) * 1000:.1f} ms")
+
+# Run every user through the conversation; returns the harness, the seconds it took and a summary line
+async def simulate(args) -> tuple[Harness, float, str]:
+    workdir = tempfile.mkdtemp()
+    telegram = FakeTelegram(latency=args.telegram_latency)
+    supabase = FakeSupabase(latency=args.supabase_latency)
+    await telegram.start()
+    await supabase.start()
+    if args.storage == "sqlite":
+        backend = SQLiteBackend(os.path.join(workdir, "shop.db"))
+        backend.upsert_products(sample_products())
+    else:
+        backend = SupabaseBackend(supabase.url, "load-test-key")
+    repository.configure(backend)
+    outbox.path = os.path.join(workdir, "outbox.db")
+    telegram_bot.ADMIN_CHANNEL_ID = ADMIN_CHANNEL_ID
+    # Scripted users click far faster than people; flood control would drop them
+    flood.control.configure(0, 0, 0, 0)
+
+    application = telegram_bot.build_application(
+        Application.builder().token("123:LOCAL").base_url(telegram.base_url), concurrent_updates=args.concurrent_updates
+    )
+    harness = Harness(application)
+    telegram.on_call = harness.on_call
+
+    await application.initialize()
+    await telegram_bot.post_init(application)
+    await application.start()
+    try:
+        users = range(FIRST_USER_ID, FIRST_USER_ID + args.users)
+        slots = asyncio.Semaphore(args.concurrency)
+
+        async def limited(user_id: int):
+            async with slots:
+                await harness.run_user(user_id, args.eager)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(limited(user_id) for user_id in users))
+        elapsed = time.perf_counter() - start
+
+        if args.storage == "sqlite":
+            orders = await backend._run(backend._fetch_all, "SELECT telegram_user_id FROM orders")
+        else:
+            orders = supabase.tables["orders"]
+        assert len(orders) == args.users, f"{len(orders)} orders for {args.users} users"
+        assert {order["telegram_user_id"] for order in orders} == set(users)
+        return harness, elapsed, f"{len(orders)} orders placed ({args.storage}), {supabase.requests} Supabase requests, {len(telegram.calls)} Bot API calls"
+    finally:
+        await application.stop()
+        await telegram_bot.post_shutdown(application)
+        await application.shutdown()
+        await supabase.stop()
+        await telegram.stop()
+
+async def run(args):
+    harness, elapsed, summary = await simulate(args)
+    report(harness, elapsed)
+    print(summary)
+
+def parse_args(argv: list | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500, help="synthetic users, each placing one order")
+    parser.add_argument("--concurrency", type=int, default=100, help="users in the conversation at the same time")
+    parser.add_argument("--storage", choices=("supabase", "sqlite"), default="supabase", help="storage backend the bot uses")
+    parser.add_argument("--supabase-latency", type=float, default=0.02, help="seconds added to every Supabase request")
+    parser.add_argument("--telegram-latency", type=float, default=0.01, help="seconds added to every Bot API call")
+    parser.add_argument("--concurrent-updates", type=int, default=telegram_bot.CONCURRENT_UPDATES, help="updates the bot handles at once")
+    parser.add_argument("--eager", action="store_true", help="send each user's steps without waiting for replies")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
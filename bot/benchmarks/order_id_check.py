@@ -0,0 +1,62 @@
+"""Check that locally generated order IDs stay unique under concurrent generation.
+
+Run from the repository root:
+
+    python bot/benchmarks/order_id_check.py [workers] [ids_per_worker]
+
+Starts several processes, each with its own worker ID and several threads
+generating IDs as fast as they can (far beyond 64 per second, so the
+sequence overflow path is exercised). It checks that every ID is unique,
+8 characters from 0-9/A-Z, and that each worker's IDs come out in sorted
+order, then reports the generation rate.
+"""
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_ids import OrderIdGenerator, ALPHABET, ORDER_ID_LENGTH
+
+THREADS_PER_WORKER = 4
+
+def generate(worker_id: int, count: int) -> list:
+    generator = OrderIdGenerator(worker_id)
+    issued = []
+    lock = threading.Lock()
+
+    def run(n):
+        for _ in range(n):
+            # Hold the lock across generation and append so `issued` reflects generation order
+            with lock:
+                issued.append(generator.next_id())
+
+    threads = [threading.Thread(target=run, args=(count // THREADS_PER_WORKER,)) for _ in range(THREADS_PER_WORKER)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return issued
+
+def main(workers: int, per_worker: int):
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        batches = list(pool.map(generate, range(workers), [per_worker] * workers))
+    elapsed = time.perf_counter() - start
+
+    all_ids = [order_id for batch in batches for order_id in batch]
+    assert len(all_ids) == len(set(all_ids)), f"{len(all_ids) - len(set(all_ids))} duplicate order IDs"
+    assert all(len(order_id) == ORDER_ID_LENGTH and set(order_id) <= set(ALPHABET) for order_id in all_ids)
+    for batch in batches:
+        assert batch == sorted(batch), "IDs from one worker are not time-ordered"
+
+    print(f"{len(all_ids)} IDs from {workers} workers x {THREADS_PER_WORKER} threads: all unique and ordered")
+    print(f"{len(all_ids) / elapsed:.0f} IDs/s, e.g. {all_ids[0]} .. {all_ids[-1]}")
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20000,
+    )
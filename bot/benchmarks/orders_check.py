@@ -0,0 +1,226 @@
+"""Check /orders paging and its per-user cache on both storage backends.
+
+Run from the repository root:
+
+    python bot/benchmarks/orders_check.py [orders]
+
+Seeds one user with `orders` orders, several sharing a created_at so the
+(created_at, id) keyset has ties to break, on fake_supabase.FakeSupabase
+and on a throwaway SQLiteBackend. For each it pages through /orders with
+the Next buttons and back with Previous, and checks every order is listed
+exactly once, newest first; that paging again is served from the cache
+with no storage query; and that approving an order from the admin channel
+drops the cache so the next /orders shows the new status. Last, two admins
+press Approve and Reject on one order at once: the check asserts one wins,
+the other is told the order was already processed, every callback query is
+answered exactly once and the customer gets one notification.
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import logging
+import itertools
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update
+from telegram.ext import Application
+import metrics
+import repository
+import flood
+import telegram_bot
+from notifications import outbox
+from supabase_backend import SupabaseBackend
+from sqlite_backend import SQLiteBackend
+from fake_telegram import FakeTelegram, BOT_USER
+from fake_supabase import FakeSupabase
+
+logging.basicConfig(level=logging.WARNING)
+for noisy in ("httpx", "tornado.access", "telegram.ext", "telegram_bot", "catalog", "receipts", "search",
+              "repository", "notifications", "supabase_backend", "sqlite_backend"):
+    logging.getLogger(noisy).setLevel(logging.ERROR)
+
+USER_ID = 400_000
+ADMIN_CHANNEL_ID = "-1001000000000"
+
+def seed_orders(count: int) -> list:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "order_string": f"ORD{i:05d}",
+            "telegram_user_id": USER_ID,
+            "user_name": "Aung Aung",
+            "phone": "09123456789",
+            "address": {"house_no": "12", "street": "Main Street", "ward": "Ward 4", "township": "Kamayut", "city": "Yangon"},
+            "items": [{"product_id": "P01", "product_name": "Product 1", "quantity": 1, "price": 1250}],
+            "total_cost": 1250 + i,
+            # Every third order shares its timestamp with the one before
+            "created_at": (start + timedelta(hours=i - i % 3 // 2)).isoformat(),
+            "delivery_type": "express_cars",
+            "status": "pending",
+        }
+        for i in range(1, count + 1)
+    ]
+
+def storage_queries() -> int:
+    return int(sum(metrics.query_calls.values.values()))
+
+class Client:
+    def __init__(self, application: Application, telegram: FakeTelegram):
+        self.application = application
+        self.telegram = telegram
+        self.ids = itertools.count(1)
+
+    # Send an update and return the text and buttons of the bot's first reply in `chat_id`
+    async def send(self, data: dict, chat_id: int) -> tuple[str, list]:
+        update_id = next(self.ids)
+        before = len(self.telegram.calls)
+        await self.application.update_queue.put(Update.de_json({"update_id": update_id, **data}, self.application.bot))
+        deadline = time.perf_counter() + 10
+        while True:
+            for method, params in self.telegram.calls[before:]:
+                if method in ("sendMessage", "editMessageText") and str(params.get("chat_id")) == str(chat_id):
+                    markup = params.get("reply_markup")
+                    buttons = re.findall(r'"callback_data": "([^"]+)"', markup) if isinstance(markup, str) else []
+                    return params["text"], buttons
+            if time.perf_counter() > deadline:
+                raise AssertionError(f"no reply to {data}")
+            await asyncio.sleep(0.005)
+
+    async def command(self, user_id: int, text: str):
+        chat = {"id": user_id, "type": "private"}
+        return await self.send({"message": {
+            "message_id": 1, "date": int(time.time()), "chat": chat, "text": text,
+            "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}],
+        }}, user_id)
+
+    async def press(self, user_id: int, data: str, chat_id: int | None = None, text: str = "...", reply_to: int | None = None):
+        chat = {"id": chat_id or user_id, "type": "channel" if chat_id else "private"}
+        return await self.send({"callback_query": {
+            "id": str(next(self.ids)), "chat_instance": "1", "data": data,
+            "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+            "message": {"message_id": 1, "date": int(time.time()), "chat": chat, "from": BOT_USER, "text": text},
+        }}, reply_to or chat["id"])
+
+    # Press a button and return the text the callback query was answered with
+    async def click(self, user_id: int, data: str, chat_id: int | None = None, text: str = "...") -> str:
+        callback_id = str(next(self.ids))
+        chat = {"id": chat_id or user_id, "type": "channel" if chat_id else "private"}
+        await self.application.update_queue.put(Update.de_json({"update_id": next(self.ids), "callback_query": {
+            "id": callback_id, "chat_instance": "1", "data": data,
+            "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+            "message": {"message_id": 1, "date": int(time.time()), "chat": chat, "from": BOT_USER, "text": text},
+        }}, self.application.bot))
+        deadline = time.perf_counter() + 10
+        while not self.telegram.callback_answers[callback_id]:
+            if time.perf_counter() > deadline:
+                raise AssertionError(f"{data} was never answered")
+            await asyncio.sleep(0.005)
+        return next(params.get("text", "") for params in self.telegram.calls_to("answerCallbackQuery")
+                    if params["callback_query_id"] == callback_id)
+
+def listed(text: str) -> list:
+    return re.findall(r"\*(ORD\d+)\*", text)
+
+async def page_through(client: Client) -> tuple[list, int]:
+    text, buttons = await client.command(USER_ID, "/orders")
+    pages = [listed(text)]
+    while any(button.startswith("orders_page_") and int(button.rsplit("_", 1)[1]) == len(pages) for button in buttons):
+        text, buttons = await client.press(USER_ID, f"orders_page_{len(pages)}")
+        pages.append(listed(text))
+    # And back to the first page with Previous
+    for page in range(len(pages) - 2, -1, -1):
+        text, buttons = await client.press(USER_ID, f"orders_page_{page}")
+        assert listed(text) == pages[page], f"page {page} changed on the way back"
+    return [order for page in pages for order in page], len(pages)
+
+async def check(backend_name: str, order_count: int):
+    telegram = FakeTelegram()
+    supabase = FakeSupabase()
+    await telegram.start()
+    await supabase.start()
+    orders = seed_orders(order_count)
+    if backend_name == "sqlite":
+        backend = SQLiteBackend(os.path.join(tempfile.mkdtemp(), "shop.db"))
+        for order in orders:
+            columns = ", ".join(order)
+            backend._connection.execute(
+                f"INSERT INTO orders ({columns}) VALUES ({', '.join('?' * len(order))})",
+                tuple(json.dumps(value) if isinstance(value, (dict, list)) else value for value in order.values())
+            )
+    else:
+        backend = SupabaseBackend(supabase.url, "orders-check-key")
+        supabase.tables["orders"] = [dict(order) for order in orders]
+    repository.configure(backend)
+    outbox.path = os.path.join(tempfile.mkdtemp(), "outbox.db")
+    telegram_bot.ADMIN_CHANNEL_ID = ADMIN_CHANNEL_ID
+    # Scripted users click far faster than people; flood control would drop them
+    flood.control.configure(0, 0, 0, 0)
+    telegram_bot.order_history_cache.clear()
+
+    application = telegram_bot.build_application(Application.builder().token("123:LOCAL").base_url(telegram.base_url))
+    client = Client(application, telegram)
+    await application.initialize()
+    await telegram_bot.post_init(application)
+    await application.start()
+    try:
+        expected = [order["order_string"] for order in sorted(orders, key=lambda order: (order["created_at"], order["id"]), reverse=True)]
+        queries = storage_queries()
+        seen, pages = await page_through(client)
+        assert seen == expected, f"{seen} != {expected}"
+        fetches = storage_queries() - queries
+        print(f"{backend_name}: {order_count} orders listed once each, newest first, over {pages} pages "
+              f"({fetches} storage queries, Previous served from cache)")
+
+        queries = storage_queries()
+        assert (await page_through(client))[0] == expected
+        assert storage_queries() == queries, "paging again queried storage"
+        print(f"{backend_name}: paging again served from the per-user cache, 0 storage queries")
+
+        newest = expected[0]
+        # Wait for the customer's notification, sent through the outbox after the transition
+        text, _ = await client.press(USER_ID, f"approve_{newest}", chat_id=int(ADMIN_CHANNEL_ID), text=f"Order {newest}", reply_to=USER_ID)
+        assert "approved" in text, text
+        text, _ = await client.command(USER_ID, "/orders")
+        assert f"*{newest}*\nStatus: Approved" in text, text
+        print(f"{backend_name}: approving {newest} dropped the cache, /orders shows it approved")
+
+        # Two admins press Approve and Reject on the same order at once
+        contested = expected[1]
+        answers = await asyncio.gather(*(
+            client.click(USER_ID + 1 + i, f"{action}_{contested}", chat_id=int(ADMIN_CHANNEL_ID), text=f"Order {contested}")
+            for i, action in enumerate(("approve", "reject"))
+        ))
+        assert sorted(answers) == ["", f"Order {contested} was already processed."], answers
+        def notices() -> list:
+            return [params["text"] for params in telegram.calls_to("sendMessage")
+                    if params["chat_id"] == str(USER_ID) and params["text"].startswith(("✅ Your order #" + contested, "❌ Your order #" + contested))]
+        deadline = time.perf_counter() + 10
+        while not notices():
+            assert time.perf_counter() < deadline, "the customer was not notified"
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.2)
+        assert set(telegram.callback_answers.values()) == {1}, telegram.callback_answers
+        assert len(notices()) == 1, notices()
+        print(f"{backend_name}: approve and reject pressed together on {contested}: one took effect, the other was "
+              f"told it was already processed, every callback answered once, the customer notified once")
+    finally:
+        await application.stop()
+        await telegram_bot.post_shutdown(application)
+        await application.shutdown()
+        await supabase.stop()
+        await telegram.stop()
+
+async def run(order_count: int):
+    for backend_name in ("supabase", "sqlite"):
+        await check(backend_name, order_count)
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 27))
@@ -0,0 +1,127 @@
+"""Check the notification outbox against a slow, unreliable fake Bot API.
+
+Run from the repository root:
+
+    python bot/benchmarks/outbox_check.py [chats] [messages_per_chat]
+
+The fake Bot API takes 200 ms per call and fails a fifth of sends with 502.
+The check measures how long enqueueing takes compared with sending inline,
+then verifies that every message is delivered exactly once and in order for
+its chat despite the failures. Then it enqueues messages, stops the
+outbox before they are sent and checks that a new outbox on the same file
+delivers them, as after a restart. Finally it stops the outbox repeatedly
+while every worker is in the middle of a send and checks shutdown returns.
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Bot
+import background
+import notifications
+from notifications import Outbox, message
+from fake_telegram import FakeTelegram
+
+logging.basicConfig(level=logging.ERROR)
+for noisy in ("notifications", "tornado.access"):
+    logging.getLogger(noisy).setLevel(logging.CRITICAL)
+
+# Retry quickly so the check finishes in seconds
+notifications.SEND_BASE_DELAY = 0.05
+SHUTDOWN_ROUNDS = 20
+
+async def wait_for(condition, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise AssertionError("Timed out waiting for the outbox to drain")
+        await asyncio.sleep(0.02)
+
+def texts_by_chat(fake: FakeTelegram) -> dict:
+    by_chat = {}
+    for params in fake.calls_to("sendMessage"):
+        by_chat.setdefault(params["chat_id"], []).append(params["text"])
+    return by_chat
+
+async def run(chats: int, per_chat: int):
+    fake = FakeTelegram(latency=0.2, failure_rate=0.2)
+    await fake.start()
+    bot = Bot("123:LOCAL", base_url=fake.base_url)
+    await bot.initialize()
+    path = os.path.join(tempfile.mkdtemp(), "outbox.db")
+
+    try:
+        outbox = Outbox(path=path)
+        outbox.start(bot)
+
+        # What a handler waits for: one inline send vs. one enqueue
+        start = time.perf_counter()
+        try:
+            await bot.send_message(chat_id=1, text="inline")
+        except Exception:
+            pass
+        inline = time.perf_counter() - start
+        start = time.perf_counter()
+        await outbox.enqueue(message("send_message", 1, "probe", text="probe"))
+        enqueue = time.perf_counter() - start
+        print(f"handler wait: inline send {inline * 1000:.0f} ms, outbox enqueue {enqueue * 1000:.1f} ms")
+
+        expected = {str(100 + c): [f"chat {c} message {i}" for i in range(per_chat)] for c in range(chats)}
+        start = time.perf_counter()
+        for i in range(per_chat):
+            for c in range(chats):
+                await outbox.enqueue(message("send_message", 100 + c, f"message {i} to chat {c}", text=f"chat {c} message {i}"))
+        total = chats * per_chat
+        await wait_for(lambda: sum(len(texts_by_chat(fake).get(chat, [])) for chat in expected) >= total)
+        elapsed = time.perf_counter() - start
+
+        delivered = texts_by_chat(fake)
+        for chat, texts in expected.items():
+            assert delivered[chat] == texts, f"chat {chat} got {delivered[chat][:5]}..."
+        print(f"{total} messages to {chats} chats delivered in order, exactly once, "
+              f"through {fake.rejected[502]} failures in {elapsed:.1f}s")
+
+        # Messages still queued when the bot stops are sent by the next run
+        fake.failure_rate = 0.0
+        await background.stop_all()
+        outbox.close()
+        leftover = Outbox(path=path)
+        await leftover.enqueue(*(message("send_message", 999, f"leftover {i}", text=f"leftover {i}") for i in range(5)))
+        leftover.close()
+
+        restarted = Outbox(path=path)
+        restarted.start(bot)
+        await wait_for(lambda: len(texts_by_chat(fake).get("999", [])) == 5)
+        assert texts_by_chat(fake)["999"] == [f"leftover {i}" for i in range(5)]
+        print("messages left in the outbox at shutdown were delivered after a restart")
+        await background.stop_all()
+        restarted.close()
+
+        # Shutting down while workers are in the middle of sending must not hang
+        for attempt in range(SHUTDOWN_ROUNDS):
+            busy = Outbox(path=os.path.join(tempfile.mkdtemp(), "outbox.db"))
+            busy.start(bot)
+            await busy.enqueue(*(message("send_message", 2000 + c, f"busy {c}", text=f"busy {c}") for c in range(busy.workers * 2)))
+            await wait_for(lambda: len(busy._busy_chats) >= busy.workers)
+            await asyncio.sleep(attempt * fake.latency / SHUTDOWN_ROUNDS)
+            try:
+                async with asyncio.timeout(5):
+                    await background.stop_all()
+            except TimeoutError:
+                raise AssertionError(f"shutdown hung with workers sending (round {attempt + 1})")
+            busy.close()
+        print(f"stopped the outbox with every worker sending {SHUTDOWN_ROUNDS} times, no hang")
+    finally:
+        await bot.shutdown()
+        await fake.stop()
+
+if __name__ == "__main__":
+    asyncio.run(run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10,
+    ))
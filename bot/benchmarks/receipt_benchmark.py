@@ -0,0 +1,118 @@
+"""Receipt rendering throughput: inline on the event loop vs. the worker pool.
+
+Run from the repository root:
+
+    python bot/benchmarks/receipt_benchmark.py [receipts]
+
+For each mode it reports receipts per second and the worst event-loop stall
+seen by a 10 ms ticker running alongside, which is what other customers feel
+while receipts are being rendered. The first row draws every line of each
+receipt, as before the static parts were compiled into a template.
+"""
+import io
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+import receipts
+from receipts import generate_pdf_receipt, ReceiptRenderer
+
+SAMPLE_ORDER = {
+    "order_string": "BENCH001",
+    "telegram_user_id": 1,
+    "user_name": "Benchmark Customer",
+    "phone": "09000000000",
+    "address": {"house_no": "12", "street": "Main St", "ward": "Ward 3", "township": "Kamayut", "city": "Yangon"},
+    "items": [{"product_id": f"P{i}", "product_name": f"Product {i}", "quantity": i + 1, "price": 1500.0} for i in range(5)],
+    "total_cost": 22500.0,
+    "delivery_type": "express_cars",
+    "status": "pending",
+}
+
+# The same receipt with every line drawn for each order, without the compiled template
+def draw_every_line(order_data: dict) -> bytes:
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    c.setFont(*receipts.TITLE_FONT)
+    c.drawString(receipts.LEFT, receipts.TITLE_Y, "ORDER RECEIPT")
+    c.setFont(*receipts.BODY_FONT)
+    c.drawString(receipts.LEFT, receipts.ORDER_ID_Y, f"Order ID: {order_data['order_string']}")
+    c.drawString(receipts.LEFT, receipts.DATE_Y, f"Date: {receipts._format_date(order_data.get('created_at'))}")
+    c.setFont(*receipts.SECTION_FONT)
+    c.drawString(receipts.LEFT, receipts.CUSTOMER_Y, "Customer Information")
+    c.setFont(*receipts.BODY_FONT)
+    c.drawString(receipts.LEFT, receipts.NAME_Y, f"Name: {order_data['user_name']}")
+    c.drawString(receipts.LEFT, receipts.PHONE_Y, f"Phone: {order_data['phone']}")
+    c.drawString(receipts.LEFT, receipts.ADDRESS_Y, f"Address: {receipts._format_address(order_data['address'])}")
+    c.setFont(*receipts.SECTION_FONT)
+    c.drawString(receipts.LEFT, receipts.ITEMS_Y, "Order Items")
+    c.setFont(*receipts.BODY_FONT)
+    y = receipts.ITEMS_Y - receipts.ROW
+    for item in order_data['items']:
+        c.drawString(receipts.LEFT, y, f"• {item['product_name']} x {item['quantity']} - {float(item['price']) * item['quantity']:.2f}")
+        y -= receipts.LINE
+    y -= receipts.ROW
+    c.setFont(*receipts.DELIVERY_FONT)
+    c.drawString(receipts.LEFT, y, f"Delivery Type: {order_data['delivery_type'].replace('_', ' ').title()}")
+    y -= receipts.ROW
+    c.setFont(*receipts.TOTAL_FONT)
+    c.drawString(receipts.LEFT, y, f"TOTAL: {float(order_data['total_cost']):.2f}")
+    c.save()
+    return buffer.getvalue()
+
+# Measure the longest gap between 10 ms ticks while `work` runs
+async def measure(work) -> tuple[float, float]:
+    worst_lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst_lag
+        while not done.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(0.01)
+            worst_lag = max(worst_lag, time.perf_counter() - before - 0.01)
+
+    tick_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - start
+    done.set()
+    await tick_task
+    return elapsed, worst_lag
+
+async def run(count: int):
+    async def every_line():
+        for _ in range(count):
+            draw_every_line(SAMPLE_ORDER)
+
+    async def inline():
+        for _ in range(count):
+            generate_pdf_receipt(SAMPLE_ORDER)
+
+    results = [("inline, every line", await measure(every_line)), ("inline, template", await measure(inline))]
+
+    for pool in ("thread", "process"):
+        renderer = ReceiptRenderer(pool=pool)
+        renderer.start()
+        # Warm up the workers so pool start-up is not counted
+        await asyncio.gather(*(renderer.render(SAMPLE_ORDER) for _ in range(renderer.workers)))
+
+        async def pooled():
+            await asyncio.gather(*(renderer.render(SAMPLE_ORDER) for _ in range(count)))
+
+        results.append((f"{pool} pool x{renderer.workers}", await measure(pooled)))
+        renderer.shutdown()
+
+    print(f"{count} receipts")
+    print(f"{'mode':<22}{'receipts/s':>12}{'max loop stall':>18}")
+    for name, (elapsed, lag) in results:
+        print(f"{name:<22}{count / elapsed:>12.1f}{lag * 1000:>15.1f} ms")
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
@@ -0,0 +1,169 @@
+"""Check stock reservations under a limited-stock drop on both storage backends.
+
+Run from the repository root:
+
+    python bot/benchmarks/reservation_check.py [stock] [users]
+
+Puts one product with `stock` units on fake_supabase.FakeSupabase and on a
+throwaway SQLiteBackend, and has `users` customers order one each at the
+same moment. The check asserts that exactly `stock` of them get it into
+their cart and the rest are told it sold out, so nothing is oversold. Then
+some customers /cancel and their units are back in stock, one places an
+order that takes their hold without decrementing stock a second time and
+is charged the product's price rather than the one it sent, and the
+remaining holds are expired and swept up in small batches. Throughout,
+stock + held + ordered always adds up to the units the drop started with.
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram.ext import Application
+import repository
+import flood
+import telegram_bot
+from notifications import outbox
+from supabase_backend import SupabaseBackend
+from sqlite_backend import SQLiteBackend
+from fake_telegram import FakeTelegram
+from fake_supabase import FakeSupabase
+from orders_check import Client
+
+logging.basicConfig(level=logging.WARNING)
+for noisy in ("httpx", "tornado.access", "telegram.ext", "telegram_bot", "catalog", "receipts", "search", "views",
+              "repository", "notifications", "supabase_backend", "sqlite_backend"):
+    logging.getLogger(noisy).setLevel(logging.ERROR)
+
+FIRST_USER_ID = 700_000
+PRODUCT_ID = "DROP"
+CANCELLING = 10
+SWEEP_BATCH = 7
+
+class Shopper(Client):
+    async def message(self, user_id: int, text: str):
+        chat = {"id": user_id, "type": "private"}
+        return await self.send({"message": {
+            "message_id": 1, "date": int(time.time()), "chat": chat, "text": text,
+            "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+        }}, user_id)
+
+    # Order one unit; True if it went into the cart, False if it had sold out
+    async def order_one(self, user_id: int) -> bool:
+        text, _ = await self.press(user_id, f"order_{PRODUCT_ID}")
+        if not text.startswith("How many"):
+            return False
+        text, _ = await self.message(user_id, "1")
+        assert text.startswith("✅ Added") or "sold out" in text, text
+        return text.startswith("✅ Added")
+
+class Shop:
+    """Reads stock and holds straight from whichever backend is in use."""
+
+    def __init__(self, backend_name: str, stock: int):
+        product = {"product_id": PRODUCT_ID, "name": "Limited Drop", "description": "Only a few made", "price": 5000, "stock": stock, "is_active": True}
+        self.supabase = FakeSupabase(products=[{"id": "00000000-0000-0000-0000-000000000001", "image_url": None, **product}])
+        if backend_name == "sqlite":
+            self.backend = SQLiteBackend(os.path.join(tempfile.mkdtemp(), "shop.db"))
+            self.backend.upsert_products([product])
+        else:
+            self.backend = None
+
+    def stock(self) -> int:
+        if isinstance(self.backend, SQLiteBackend):
+            return self.backend._connection.execute("SELECT stock FROM products WHERE product_id = ?", (PRODUCT_ID,)).fetchone()[0]
+        return self.supabase.tables["products"][0]["stock"]
+
+    def held(self) -> int:
+        if isinstance(self.backend, SQLiteBackend):
+            return self.backend._connection.execute("SELECT COALESCE(SUM(quantity), 0) FROM stock_reservations").fetchone()[0]
+        return sum(hold["quantity"] for hold in self.supabase.tables["stock_reservations"])
+
+    def ordered(self) -> int:
+        if isinstance(self.backend, SQLiteBackend):
+            return self.backend._connection.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+        return len(self.supabase.tables["orders"])
+
+    def expire_all(self):
+        if isinstance(self.backend, SQLiteBackend):
+            self.backend._connection.execute("UPDATE stock_reservations SET expires_at = '2000-01-01T00:00:00.000+00:00'")
+        else:
+            for hold in self.supabase.tables["stock_reservations"]:
+                hold["expires_at"] = "2000-01-01T00:00:00+00:00"
+
+async def check(backend_name: str, stock: int, user_count: int):
+    telegram = FakeTelegram()
+    shop = Shop(backend_name, stock)
+    await telegram.start()
+    await shop.supabase.start()
+    repository.configure(shop.backend or SupabaseBackend(shop.supabase.url, "reservation-check-key"))
+    outbox.path = os.path.join(tempfile.mkdtemp(), "outbox.db")
+    flood.control.configure(0, 0, 0, 0)
+    telegram_bot.RESERVATION_SWEEP_BATCH = SWEEP_BATCH
+    telegram_bot.catalog.invalidate()
+
+    def accounted() -> int:
+        return shop.stock() + shop.held() + shop.ordered()
+
+    application = telegram_bot.build_application(Application.builder().token("123:LOCAL").base_url(telegram.base_url))
+    shopper = Shopper(application, telegram)
+    await application.initialize()
+    await telegram_bot.post_init(application)
+    await application.start()
+    try:
+        users = list(range(FIRST_USER_ID, FIRST_USER_ID + user_count))
+        start = time.perf_counter()
+        results = await asyncio.gather(*(shopper.order_one(user_id) for user_id in users))
+        elapsed = time.perf_counter() - start
+        holders = [user_id for user_id, added in zip(users, results) if added]
+        assert len(holders) == min(stock, user_count), f"{len(holders)} customers got one of {stock}"
+        assert shop.stock() == stock - len(holders) and shop.held() == len(holders), (shop.stock(), shop.held())
+        print(f"{backend_name}: {user_count} customers ordering {stock} units at once in {elapsed:.2f}s: "
+              f"{len(holders)} held, {user_count - len(holders)} told it sold out, stock {shop.stock()}")
+
+        cancelling, holders = holders[:CANCELLING], holders[CANCELLING:]
+        for user_id in cancelling:
+            text, _ = await shopper.command(user_id, "/cancel")
+            assert text.startswith("Order cancelled"), text
+        assert shop.stock() == stock - len(holders) and accounted() == stock
+        text, _ = await shopper.press(FIRST_USER_ID + user_count, f"order_{PRODUCT_ID}")
+        assert f"(1-{len(cancelling)})" in text, text
+        print(f"{backend_name}: {len(cancelling)} customers cancelled, their units are back on sale")
+
+        buyer = holders.pop()
+        before = shop.stock()
+        # The price sent is ignored; the order is priced from the products table
+        placed = await repository.place_order({
+            "order_string": "RES00001", "telegram_user_id": buyer, "user_name": "Aung Aung", "phone": "09123456789",
+            "address": {"house_no": "12", "street": "Main Street", "ward": "Ward 4", "township": "Kamayut", "city": "Yangon"},
+            "items": [{"product_id": PRODUCT_ID, "product_name": "Limited Drop", "quantity": 1, "price": 1}],
+            "total_cost": 1, "delivery_type": "express_cars", "status": "pending",
+        }, None)
+        assert float(placed["total_cost"]) == 5000 and float(placed["items"][0]["price"]) == 5000, placed
+        assert shop.stock() == before and shop.held() == len(holders) and accounted() == stock
+        print(f"{backend_name}: an order took its customer's hold, stock not decremented twice, priced from the product")
+
+        shop.expire_all()
+        await telegram_bot.release_expired_reservations()
+        assert shop.held() == 0 and shop.stock() == stock - 1 and accounted() == stock
+        print(f"{backend_name}: {len(holders)} expired holds swept back into stock {SWEEP_BATCH} at a time, "
+              f"stock {shop.stock()} + 1 ordered = {stock}")
+    finally:
+        await application.stop()
+        await telegram_bot.post_shutdown(application)
+        await application.shutdown()
+        await shop.supabase.stop()
+        await telegram.stop()
+
+async def run(stock: int, user_count: int):
+    for backend_name in ("supabase", "sqlite"):
+        await check(backend_name, stock, user_count)
+
+if __name__ == "__main__":
+    stock = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    user_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    asyncio.run(run(stock, user_count))
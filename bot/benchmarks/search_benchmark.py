@@ -0,0 +1,125 @@
+"""Search index build time, query latency and incremental refresh.
+
+Run from the repository root:
+
+    python bot/benchmarks/search_benchmark.py [products] [queries]
+
+Indexes a synthetic catalog of `products` items, then times `queries`
+searches mixing exact words, product IDs, prefixes and misspellings, and
+reports p50/p99 latency per query. Then it loads the same catalog into a
+throwaway SQLiteBackend, builds the index through refresh(), changes,
+deactivates and deletes a few products, and checks one more refresh picks
+up exactly those changes.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import repository
+from search import ProductIndex
+from sqlite_backend import SQLiteBackend
+
+logging.basicConfig(level=logging.WARNING)
+
+ADJECTIVES = ["red", "blue", "green", "black", "white", "leather", "cotton", "wooden", "steel", "golden", "silk", "wireless"]
+NOUNS = ["shoes", "shirt", "phone", "case", "table", "chair", "watch", "bag", "lamp", "headphones", "jacket", "bottle"]
+MATERIALS = ["handmade in Yangon", "imported", "waterproof", "limited edition", "gift box included", "two year warranty"]
+
+def synthetic_products(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [
+        {
+            "product_id": f"P{i:05d}",
+            "name": f"{rng.choice(ADJECTIVES)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}",
+            "description": f"{rng.choice(MATERIALS)}, {rng.choice(MATERIALS)}",
+            "price": rng.randrange(1000, 100000, 50),
+            "stock": 100,
+            "is_active": True,
+        }
+        for i in range(1, count + 1)
+    ]
+
+def sample_queries(products: list, count: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        product = rng.choice(products)
+        words = product["name"].split()
+        kind = rng.randrange(4)
+        if kind == 0:
+            queries.append(" ".join(words[:2]))
+        elif kind == 1:
+            queries.append(product["product_id"].lower())
+        elif kind == 2:
+            queries.append(words[2][:4])
+        else:
+            word = words[2]
+            position = rng.randrange(1, len(word) - 1)
+            queries.append(word[:position] + word[position + 1] + word[position] + word[position + 2:])
+    return queries
+
+def benchmark_queries(products: list, query_count: int):
+    index = ProductIndex()
+    start = time.perf_counter()
+    for product in products:
+        index.add(product)
+    build = time.perf_counter() - start
+    print(f"indexed {len(index)} products in {build * 1000:.0f} ms ({len(index._postings)} words)")
+
+    timings = []
+    empty = 0
+    for query in sample_queries(products, query_count):
+        start = time.perf_counter()
+        results = index.search(query)
+        timings.append(time.perf_counter() - start)
+        empty += not results
+    quantiles = statistics.quantiles(timings, n=100)
+    print(f"{query_count} queries: p50 {quantiles[49] * 1000:.3f} ms, p99 {quantiles[98] * 1000:.3f} ms, "
+          f"max {max(timings) * 1000:.3f} ms, {empty} without results")
+
+    assert index.search("P00042")[0]["product_id"] == "P00042"
+    misspelt = index.search("headphnoes")
+    assert misspelt and all("headphones" in product["name"] for product in misspelt), misspelt
+
+async def check_refresh(products: list):
+    backend = SQLiteBackend(os.path.join(tempfile.mkdtemp(), "shop.db"))
+    backend.upsert_products(products)
+    repository.configure(backend)
+    index = ProductIndex()
+    try:
+        start = time.perf_counter()
+        await index.refresh()
+        print(f"initial refresh from SQLite: {len(index)} products in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        await asyncio.sleep(0.01)
+        backend.upsert_products([
+            {"product_id": "P00001", "name": "Turquoise teapot", "price": 5000},
+            {"product_id": "P00002", "name": products[1]["name"], "price": 5000, "is_active": False},
+        ])
+        backend._connection.execute("DELETE FROM products WHERE product_id = 'P00003'")
+        start = time.perf_counter()
+        changed = await repository.get_products_changed_since(index._synced_at)
+        await index.refresh()
+        print(f"incremental refresh: {len(changed)} changed rows fetched, applied in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        assert [product["product_id"] for product in index.search("teapot")] == ["P00001"]
+        assert "P00002" not in index.products and "P00003" not in index.products
+        assert len(index) == len(products) - 2
+        assert len(changed) < len(products) // 100, f"{len(changed)} rows fetched for 3 changes"
+        print("refresh picked up the rename, the deactivation and the deletion")
+    finally:
+        await repository.close()
+
+if __name__ == "__main__":
+    product_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    products = synthetic_products(product_count)
+    benchmark_queries(products, query_count)
+    asyncio.run(check_refresh(products))
@@ -0,0 +1,152 @@
+"""Cost of a browse or product click with and without the view cache.
+
+Run from the repository root:
+
+    python bot/benchmarks/view_benchmark.py [products] [clicks]
+
+Loads `products` products into a throwaway SQLiteBackend and replays
+`clicks` random clicks on browse pages and product details, first rendering
+every message from the catalog rows as the handlers used to, then through
+views.ViewCache. It reports microseconds per click for both and checks that
+cached clicks make no storage query. Then it resets the catalog and checks
+that the views clicked since the last reset are rendered again in one batch,
+with one query per page and one for all product views, so the clicks after
+the reset are served from the cache once more. A second reset with only a
+few clicks in between renders just those views. Last, it takes most
+products down and checks that a page past the new end shows the last page.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+import repository
+import background
+from catalog import catalog
+from views import ViewCache, render_page, render_product
+from sqlite_backend import SQLiteBackend
+
+logging.basicConfig(level=logging.WARNING)
+
+PER_PAGE = 5
+
+def products(count: int) -> list:
+    return [
+        {"product_id": f"P{i:04d}", "name": f"Product {i}", "description": f"Sample product number {i}", "price": 1000 + 10 * i, "stock": 10}
+        for i in range(1, count + 1)
+    ]
+
+def storage_queries() -> int:
+    return int(sum(metrics.query_calls.values.values()))
+
+def sample_clicks(product_count: int, count: int, seed: int = 3) -> list:
+    rng = random.Random(seed)
+    pages = (product_count + PER_PAGE - 1) // PER_PAGE
+    return [
+        ('page', rng.randrange(pages)) if rng.random() < 0.5 else ('product', f"P{rng.randrange(1, product_count + 1):04d}")
+        for _ in range(count)
+    ]
+
+async def render_uncached(click: tuple):
+    if click[0] == 'page':
+        rows, total = await catalog.get_page(click[1], PER_PAGE)
+        return render_page(rows, click[1], total, PER_PAGE)
+    return render_product(await catalog.get_product(click[1]))
+
+async def replay(clicks: list, click) -> float:
+    start = time.perf_counter()
+    for target in clicks:
+        await click(target)
+    return (time.perf_counter() - start) / len(clicks) * 1e6
+
+async def run(product_count: int, click_count: int):
+    backend = SQLiteBackend(os.path.join(tempfile.mkdtemp(), "shop.db"))
+    backend.upsert_products(products(product_count))
+    repository.configure(backend)
+    views = ViewCache()
+    clicks = sample_clicks(product_count, click_count)
+
+    async def settle():
+        while background._tasks:
+            await asyncio.gather(*background._tasks)
+
+    # Reset the catalog and let the views notice it
+    async def reset():
+        await settle()
+        catalog.invalidate()
+        catalog._ensure_fresh()
+        views._check_version()
+        await settle()
+    try:
+        # Warm the catalog and the views so both runs below only measure hot clicks
+        for target in set(clicks):
+            await render_uncached(target)
+        async def cached(target: tuple):
+            if target[0] == 'page':
+                return await views.page(target[1], PER_PAGE)
+            return await views.product(target[1])
+        await replay(clicks, cached)
+
+        queries = storage_queries()
+        uncached_us = await replay(clicks, render_uncached)
+        cached_us = await replay(clicks, cached)
+        assert storage_queries() == queries, "hot clicks queried storage"
+        print(f"{click_count} clicks over {len(views)} views: {uncached_us:.1f} us/click rendering each time, "
+              f"{cached_us:.1f} us/click from the view cache, 0 storage queries")
+
+        first = await views.page(0, PER_PAGE)
+        rows, total = await catalog.get_page(0, PER_PAGE)
+        assert first == render_page(rows, 0, total, PER_PAGE)
+
+        view_count = len(views)
+        pages = sum(1 for target in set(clicks) if target[0] == 'page')
+        catalog.invalidate()
+        queries = storage_queries()
+        start = time.perf_counter()
+        assert await views.page(0, PER_PAGE) is not first
+        await settle()
+        regenerate_queries = storage_queries() - queries
+        print(f"catalog reset: {len(views)} of {view_count} views rendered again in "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms with {regenerate_queries} storage queries")
+        assert len(views) == view_count
+        assert regenerate_queries <= pages + 1, regenerate_queries
+
+        queries = storage_queries()
+        await replay(clicks, cached)
+        assert storage_queries() == queries, "clicks after the reset queried storage"
+        print("clicks after the reset served from the view cache, 0 storage queries")
+
+        # Only views clicked since the last reset are worth rendering again
+        await reset()
+        recent = list(dict.fromkeys(clicks))[:10]
+        await replay(recent, cached)
+        await reset()
+        await settle()
+        assert len(views) == len(recent), (len(views), len(recent))
+        await reset()
+        await settle()
+        assert len(views) == 0, len(views)
+        print(f"reset after {len(recent)} distinct clicks rendered {len(recent)} views, a reset with no clicks rendered none")
+
+        # An old Next button pressed after most products were taken down shows the last page
+        old_last = (product_count - 1) // PER_PAGE
+        backend._connection.execute("UPDATE products SET is_active = 0 WHERE product_id > ?", (f"P{2 * PER_PAGE + 1:04d}",))
+        await reset()
+        view = await views.page(old_last, PER_PAGE)
+        buttons = [button.callback_data for row in view.reply_markup.inline_keyboard for button in row]
+        assert "(Page 3/3)" in view.text, view.text
+        assert buttons[:2] == ["product_P0011", "browse_products_1"], buttons
+        print(f"page {old_last + 1} pressed after the catalog shrank to 3 pages showed page 3/3")
+    finally:
+        await repository.close()
+
+if __name__ == "__main__":
+    product_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    click_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    asyncio.run(run(product_count, click_count))
@@ -0,0 +1,105 @@
+"""Drive the bot's webhook mode locally with synthetic POSTed updates.
+
+Run from the repository root:
+
+    python bot/benchmarks/webhook_check.py [updates]
+
+Starts the real application in webhook mode against a fake Bot API, checks
+that the webhook is registered with the narrowed allowed_updates, secret
+token and max_connections, that forged requests are rejected, and that
+posted updates are answered. It then reports webhook updates handled per
+second.
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import logging
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram.ext import Application
+import flood
+import telegram_bot
+from fake_telegram import FakeTelegram
+
+for noisy in ("httpx", "tornado.access", "telegram.ext.Application"):
+    logging.getLogger(noisy).setLevel(logging.WARNING)
+
+SECRET_TOKEN = "local-check-secret"
+
+def help_update(update_id: int, user_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"},
+            "text": "/help",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 5}],
+        },
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def wait_for(condition, timeout: float = 10.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise AssertionError("Timed out waiting for the bot to respond")
+        await asyncio.sleep(0.01)
+
+async def run(count: int):
+    fake = FakeTelegram()
+    await fake.start()
+
+    # Measure handling, not the bot-wide flood limit
+    flood.control.configure(0, 0, 0, 0)
+    application = telegram_bot.build_application(Application.builder().token("123:LOCAL").base_url(fake.base_url))
+    settings = telegram_bot.webhook_settings(SECRET_TOKEN)
+    port = free_port()
+    settings.update(listen="127.0.0.1", port=port, webhook_url=f"http://127.0.0.1:{port}/{settings['url_path']}")
+
+    await application.initialize()
+    await application.start()
+    await application.updater.start_webhook(**settings)
+    url = settings["webhook_url"]
+
+    try:
+        registration = fake.calls_to("setWebhook")[-1]
+        assert registration["secret_token"] == SECRET_TOKEN
+        assert registration["max_connections"] == str(settings["max_connections"])
+        assert registration["allowed_updates"] == '["message", "callback_query", "inline_query"]', registration["allowed_updates"]
+        print(f"setWebhook: allowed_updates={registration['allowed_updates']} max_connections={registration['max_connections']}")
+
+        async with httpx.AsyncClient() as client:
+            forged = await client.post(url, json=help_update(1, 1), headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"})
+            assert forged.status_code == 403, forged.status_code
+            print("forged update rejected with 403")
+
+            headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET_TOKEN}
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(
+                client.post(url, json=help_update(i + 2, 10_000 + i), headers=headers) for i in range(count)
+            ))
+            assert all(response.status_code == 200 for response in responses)
+            await wait_for(lambda: len(fake.calls_to("sendMessage")) >= count)
+            elapsed = time.perf_counter() - start
+
+        replied_to = {params["chat_id"] for params in fake.calls_to("sendMessage")}
+        assert replied_to == {str(10_000 + i) for i in range(count)}
+        print(f"{count} webhook updates answered in {elapsed:.2f}s ({count / elapsed:.1f} updates/s)")
+    finally:
+        await application.updater.stop()
+        await application.stop()
+        await application.shutdown()
+        await fake.stop()
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from telegram.error import BadRequest, Forbidden, RetryAfter, TimedOut, NetworkError
+import repository
+from notifications import retry_after_seconds, SEND_BASE_DELAY
+from config import BROADCAST_RATE, BROADCAST_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Tries per recipient before a broadcast message counts as failed
+SEND_ATTEMPTS = 4
+
+class RateLimiter:
+    """Spaces calls out to at most `rate` per second.
+
+    A flood-control response from Telegram applies to the whole bot, so
+    `pause()` holds back every caller until the requested time has passed.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            slot = max(now, self._next_slot, self._paused_until)
+            self._next_slot = slot + self.interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            # A pause that started while we slept means taking a later slot
+            if loop.time() >= self._paused_until:
+                return
+
+    def pause(self, seconds: float):
+        until = asyncio.get_running_loop().time() + seconds
+        self._paused_until = max(self._paused_until, until)
+
+class BroadcastSender:
+    """Sends broadcasts saved from the admin panel to every non-banned user.
+
+    Recipients are read from `profiles` in telegram_user_id order, one batch
+    at a time. After each batch the last recipient and the delivered/failed
+    counts are written back to the broadcast row, so a restart resumes from
+    the last finished batch.
+    """
+
+    def __init__(self, rate: float = BROADCAST_RATE, batch_size: int = BROADCAST_BATCH_SIZE):
+        self.limiter = RateLimiter(rate)
+        self.batch_size = batch_size
+
+    # Send every pending broadcast, oldest first, finishing any that were interrupted
+    async def run_pending(self, bot):
+        while broadcast := await repository.get_next_broadcast():
+            if broadcast['status'] == 'pending':
+                claimed = await repository.claim_broadcast(broadcast['id'], {
+                    "started_at": datetime.now(timezone.utc).isoformat(),
+                    "recipient_count": 0,
+                    "failed_count": 0,
+                    "last_recipient_id": None
+                })
+                if not claimed:
+                    continue
+                broadcast.update(recipient_count=0, failed_count=0, last_recipient_id=None)
+            else:
+                logger.info(f"Resuming broadcast {broadcast['id']} after recipient {broadcast['last_recipient_id']}")
+            await self.send_broadcast(bot, broadcast)
+
+    async def send_broadcast(self, bot, broadcast: dict):
+        broadcast_id = broadcast['id']
+        delivered = broadcast.get('recipient_count') or 0
+        failed = broadcast.get('failed_count') or 0
+        cursor = broadcast.get('last_recipient_id')
+
+        while recipients := await repository.get_broadcast_recipients(cursor, self.batch_size):
+            results = await asyncio.gather(*(self._deliver(bot, chat_id, broadcast['message']) for chat_id in recipients))
+            delivered += sum(results)
+            failed += len(results) - sum(results)
+            cursor = recipients[-1]
+            await repository.update_broadcast(broadcast_id, {
+                "last_recipient_id": cursor,
+                "recipient_count": delivered,
+                "failed_count": failed
+            })
+
+        await repository.update_broadcast(broadcast_id, {
+            "status": "sent",
+            "completed_at": datetime.now(timezone.utc).isoformat()
+        })
+        logger.info(f"Broadcast {broadcast_id} sent to {delivered} users, {failed} failed")
+
+    # Send one message at the limiter's pace; True if it was delivered
+    async def _deliver(self, bot, chat_id: int, text: str) -> bool:
+        for attempt in range(1, SEND_ATTEMPTS + 1):
+            await self.limiter.wait()
+            try:
+                await bot.send_message(chat_id=chat_id, text=text)
+                return True
+            except RetryAfter as e:
+                delay = retry_after_seconds(e)
+                logger.warning(f"Broadcast flood limit hit, pausing {delay:.1f}s")
+                self.limiter.pause(delay)
+            except (Forbidden, BadRequest) as e:
+                # Blocked the bot, deleted their account or never started a chat
+                logger.debug(f"Broadcast to {chat_id} failed: {e}")
+                return False
+            except (TimedOut, NetworkError) as e:
+                logger.warning(f"Broadcast to {chat_id} failed (attempt {attempt}/{SEND_ATTEMPTS}): {e}")
+                if attempt < SEND_ATTEMPTS:
+                    await asyncio.sleep(SEND_BASE_DELAY * 2 ** (attempt - 1))
+        return False
+
+sender = BroadcastSender()
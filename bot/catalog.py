@@ -0,0 +1,100 @@
+import time
+import asyncio
+import logging
+import repository
+from config import CATALOG_TTL
+
+logger = logging.getLogger(__name__)
+
+class ProductCatalog:
+    """In-memory cache of the products table.
+
+    Full product rows are cached by product_id and browse pages are cached by
+    page number, both filled on first use. Everything is dropped together once
+    the TTL has passed or after invalidate(), and each reset bumps `version`
+    so callers can tell when derived data is stale.
+    """
+
+    def __init__(self, ttl: float = CATALOG_TTL):
+        self.ttl = ttl
+        self.version = 0
+        self._entries = {}
+        self._pending = {}
+        self._total = None
+        self._expires_at = 0.0
+
+    def invalidate(self):
+        self._expires_at = 0.0
+
+    # Drop one cached product row, e.g. after its stock changed
+    def invalidate_product(self, product_id: str):
+        self._entries.pop(('product', product_id), None)
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if now < self._expires_at:
+            return
+        self._entries = {}
+        self._pending = {}
+        self._total = None
+        self._expires_at = now + self.ttl
+        self.version += 1
+        logger.info(f"Product catalog reset (version {self.version})")
+
+    # Load a cache entry once, letting concurrent callers share the same fetch
+    async def _load(self, key: tuple, fetch):
+        if key in self._entries:
+            return self._entries[key]
+        version = self.version
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._pending[key] = task
+        try:
+            value = await task
+        finally:
+            if self.version == version:
+                self._pending.pop(key, None)
+        if self.version == version:
+            self._entries[key] = value
+        return value
+
+    async def get_product(self, product_id: str, active_only: bool = False) -> dict | None:
+        self._ensure_fresh()
+        product = await self._load(('product', product_id), lambda: repository.get_product(product_id))
+        if product and active_only and not product.get('is_active'):
+            return None
+        return product
+
+    # Full rows for several products at once (None for ones that do not exist): cached rows as
+    # they are, and all the others in a single query that then fills the cache
+    async def get_products(self, product_ids: list) -> dict:
+        self._ensure_fresh()
+        products = {
+            product_id: self._entries[('product', product_id)]
+            for product_id in product_ids if ('product', product_id) in self._entries
+        }
+        missing = [product_id for product_id in dict.fromkeys(product_ids) if product_id not in products]
+        if missing:
+            version = self.version
+            rows = {row['product_id']: row for row in await repository.get_products(missing)}
+            for product_id in missing:
+                products[product_id] = rows.get(product_id)
+                if self.version == version:
+                    self._entries[('product', product_id)] = rows.get(product_id)
+        return products
+
+    # Return one page of active products (product_id, name, price) and the total active count
+    async def get_page(self, page: int, per_page: int) -> tuple[list, int]:
+        self._ensure_fresh()
+
+        async def fetch():
+            rows, count = await repository.get_product_page(page * per_page, per_page, with_count=self._total is None)
+            if count is not None:
+                self._total = count
+            return rows
+
+        rows = await self._load(('page', page, per_page), fetch)
+        return rows, self._total or 0
+
+catalog = ProductCatalog()
@@ -0,0 +1,102 @@
+import os
+from dotenv import load_dotenv
+
+# Tuning settings for the bot's helper modules. Loaded here, rather than in each
+# module, so values from .env are in place before any of them is imported.
+load_dotenv()
+
+# Where products, orders and profiles live: "supabase" or "sqlite" (a local file, no admin panel)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "bot_shop.db")
+
+# Maximum number of Supabase requests allowed in flight at once
+SUPABASE_MAX_CONCURRENCY = int(os.getenv("SUPABASE_MAX_CONCURRENCY", "8"))
+
+# Seconds cached catalog data is served before it is fetched again
+CATALOG_TTL = float(os.getenv("CATALOG_TTL_SECONDS", "60"))
+
+# Seconds between search index refreshes (each fetches only products changed since the last one)
+SEARCH_REFRESH_INTERVAL = float(os.getenv("SEARCH_REFRESH_INTERVAL_SECONDS", "60"))
+
+# Inline mode: seconds Telegram may cache an answer, and how long to wait for the user to stop
+# typing before answering (a newer query from the same user replaces the pending one)
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME_SECONDS", "300"))
+INLINE_DEBOUNCE = float(os.getenv("INLINE_DEBOUNCE_SECONDS", "0.3"))
+
+# Flood control: updates per second each user may send on average and in a burst, the same for
+# all users together, and how many users' buckets to keep. A rate of 0 turns that limit off.
+FLOOD_USER_RATE = float(os.getenv("FLOOD_USER_RATE", "1"))
+FLOOD_USER_BURST = float(os.getenv("FLOOD_USER_BURST", "10"))
+FLOOD_GLOBAL_RATE = float(os.getenv("FLOOD_GLOBAL_RATE", "50"))
+FLOOD_GLOBAL_BURST = float(os.getenv("FLOOD_GLOBAL_BURST", "100"))
+FLOOD_CACHE_SIZE = int(os.getenv("FLOOD_CACHE_SIZE", "10000"))
+
+# Stock reservations: seconds an item added to the cart stays held (every new item extends the
+# whole cart), how often expired holds are put back into stock, and how many per database call
+RESERVATION_TTL = int(os.getenv("RESERVATION_TTL_SECONDS", "900"))
+RESERVATION_SWEEP_INTERVAL = float(os.getenv("RESERVATION_SWEEP_INTERVAL_SECONDS", "60"))
+RESERVATION_SWEEP_BATCH = int(os.getenv("RESERVATION_SWEEP_BATCH", "500"))
+
+# Ban status cache
+BAN_CACHE_SIZE = int(os.getenv("BAN_CACHE_SIZE", "10000"))
+BAN_CACHE_TTL = float(os.getenv("BAN_CACHE_TTL_SECONDS", "300"))
+BAN_REFRESH_INTERVAL = float(os.getenv("BAN_REFRESH_INTERVAL_SECONDS", "60"))
+
+# Most updates handled at once. Updates from different users run concurrently while each
+# user's own updates are still handled one at a time, in order. 1 handles every update in turn.
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "256"))
+
+# How the bot receives updates: "polling" or "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+
+# Webhook server (only used when BOT_MODE=webhook)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # Public HTTPS URL Telegram posts to, e.g. https://bot.example.com/telegram
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN", "")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+# Conversation and cart persistence: "sqlite", "pickle" or "none"
+PERSISTENCE_BACKEND = os.getenv("PERSISTENCE_BACKEND", "sqlite")
+PERSISTENCE_PATH = os.getenv("PERSISTENCE_PATH", "bot_state.db")
+PERSISTENCE_INTERVAL = float(os.getenv("PERSISTENCE_INTERVAL_SECONDS", "10"))
+
+# Worker ID (0-31) baked into locally generated order IDs; give every bot process its own
+ORDER_ID_WORKER_ID = int(os.environ["ORDER_ID_WORKER_ID"]) if os.getenv("ORDER_ID_WORKER_ID") else None
+
+# /orders history cache: users kept, and how long a page is served before it is fetched again
+# (the bot drops a user's pages itself when it places or approves/rejects one of their orders)
+ORDER_HISTORY_CACHE_SIZE = int(os.getenv("ORDER_HISTORY_CACHE_SIZE", "5000"))
+ORDER_HISTORY_CACHE_TTL = float(os.getenv("ORDER_HISTORY_CACHE_TTL_SECONDS", "300"))
+
+# Receipt file_id cache (order_string -> Telegram file_id)
+RECEIPT_CACHE_SIZE = int(os.getenv("RECEIPT_CACHE_SIZE", "5000"))
+RECEIPT_CACHE_TTL = float(os.getenv("RECEIPT_CACHE_TTL_SECONDS", "86400"))
+
+# Receipt rendering pool
+RECEIPT_POOL = os.getenv("RECEIPT_POOL", "process")  # "process" or "thread"
+RECEIPT_WORKERS = int(os.getenv("RECEIPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+RECEIPT_QUEUE_SIZE = int(os.getenv("RECEIPT_QUEUE_SIZE", "32"))
+
+# Broadcast sender: whether this process sends broadcasts, messages per second,
+# recipients per checkpointed batch, and how often to look for new broadcasts
+BROADCAST_ENABLED = os.getenv("BROADCAST_ENABLED", "true").lower() in ("1", "true", "yes")
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "100"))
+BROADCAST_POLL_INTERVAL = float(os.getenv("BROADCAST_POLL_INTERVAL_SECONDS", "15"))
+
+# Notification outbox: SQLite file, delivery workers, messages read per pass,
+# attempts before a message is dropped, and how often to look for due retries
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "bot_outbox.db")
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "1"))
+
+# Metrics: port for the Prometheus /metrics endpoint (0 disables it) and the address it listens on
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+
+# Telegram user IDs allowed to use admin-only bot commands such as /stats (comma-separated)
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
@@ -0,0 +1,76 @@
+import time
+from cache import TTLCache
+from config import FLOOD_USER_RATE, FLOOD_USER_BURST, FLOOD_GLOBAL_RATE, FLOOD_GLOBAL_BURST, FLOOD_CACHE_SIZE
+
+# A user sending messages too fast is told so at most once per this many seconds
+WARN_INTERVAL = 60
+
+class TokenBucket:
+    """Allows `rate` calls per second on average, and bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def give_back(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+class FloodControl:
+    """Per-user and bot-wide token buckets checked before any handler runs.
+
+    Each user gets a bucket of FLOOD_USER_BURST updates refilled at
+    FLOOD_USER_RATE per second, and all users share one more bucket sized by
+    the FLOOD_GLOBAL_* settings, so one scripted client cannot use up the
+    database for everyone. A rate of 0 turns that bucket off. A user's bucket
+    is forgotten once it would have refilled anyway.
+    """
+
+    def __init__(self, user_rate: float = FLOOD_USER_RATE, user_burst: float = FLOOD_USER_BURST,
+                 global_rate: float = FLOOD_GLOBAL_RATE, global_burst: float = FLOOD_GLOBAL_BURST):
+        self.configure(user_rate, user_burst, global_rate, global_burst)
+
+    def configure(self, user_rate: float, user_burst: float, global_rate: float, global_burst: float):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_bucket = TokenBucket(global_rate, global_burst) if global_rate > 0 else None
+        self._users = TTLCache(maxsize=FLOOD_CACHE_SIZE, ttl=user_burst / user_rate if user_rate > 0 else 0)
+        self._warned = TTLCache(maxsize=FLOOD_CACHE_SIZE, ttl=WARN_INTERVAL)
+
+    # Take a token for one update from `user_id`; None if it may go ahead, else which bucket was empty
+    def check(self, user_id: int) -> str | None:
+        if self.user_rate > 0:
+            bucket = self._users.get(user_id)
+            if bucket is None:
+                bucket = TokenBucket(self.user_rate, self.user_burst)
+            # Storing again also pushes the expiry back
+            self._users.set(user_id, bucket)
+            if not bucket.take():
+                return "user"
+        else:
+            bucket = None
+        if self.global_bucket is not None and not self.global_bucket.take():
+            # Not this user's fault, so do not charge them for it
+            if bucket is not None:
+                bucket.give_back()
+            return "global"
+        return None
+
+    # True the first time in WARN_INTERVAL that `user_id` should be told to slow down
+    def should_warn(self, user_id: int) -> bool:
+        if user_id in self._warned:
+            return False
+        self._warned.set(user_id, True)
+        return True
+
+control = FloodControl()
@@ -0,0 +1,209 @@
+import time
+import bisect
+import logging
+import functools
+from telegram.ext import Application, ApplicationHandlerStop, ConversationHandler
+from tornado.web import Application as WebApplication, RequestHandler
+from tornado.httpserver import HTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Latency bucket upper bounds in seconds (the Prometheus client defaults)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+class Metric:
+    """A counter or gauge with one value per combination of label values."""
+
+    def __init__(self, name: str, help_text: str, kind: str, labelnames: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.labelnames = labelnames
+        self.values = {}
+
+    def inc(self, labels: tuple, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def dec(self, labels: tuple, amount: float = 1.0):
+        self.inc(labels, -amount)
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, dict(zip(self.labelnames, labels)), value
+
+class Histogram(Metric):
+    """Latency histogram: per label combination, a count per bucket plus the sum and count."""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple, buckets: tuple = BUCKETS):
+        super().__init__(name, help_text, "histogram", labelnames)
+        self.buckets = buckets
+
+    def observe(self, labels: tuple, value: float):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series["buckets"][index] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    # Estimate a quantile as the upper bound of the bucket it falls in
+    def quantile(self, labels: tuple, q: float) -> float:
+        series = self.values[labels]
+        rank = q * series["count"]
+        seen = 0
+        for bound, count in zip(self.buckets, series["buckets"]):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def samples(self):
+        for labels, series in self.values.items():
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["buckets"]):
+                cumulative += count
+                yield f"{self.name}_bucket", {**base, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_bucket", {**base, "le": "+Inf"}, series["count"]
+            yield f"{self.name}_sum", base, series["sum"]
+            yield f"{self.name}_count", base, series["count"]
+
+HANDLER_LABELS = ("handler",)
+QUERY_LABELS = ("table", "query")
+
+handler_latency = Histogram("bot_handler_duration_seconds", "Time spent in each update handler", HANDLER_LABELS)
+handler_calls = Metric("bot_handler_calls_total", "Updates handled, by handler", "counter", HANDLER_LABELS)
+handler_errors = Metric("bot_handler_errors_total", "Handler calls that raised, by handler", "counter", HANDLER_LABELS)
+handler_in_progress = Metric("bot_handler_in_progress", "Handler calls currently running", "gauge", HANDLER_LABELS)
+
+query_latency = Histogram("bot_storage_query_duration_seconds", "Time for each storage backend call, including waiting for a free connection", QUERY_LABELS)
+query_calls = Metric("bot_storage_queries_total", "Storage backend calls, by table and query", "counter", QUERY_LABELS)
+query_errors = Metric("bot_storage_query_errors_total", "Storage backend calls that failed, by table and query", "counter", QUERY_LABELS)
+query_in_progress = Metric("bot_storage_queries_in_progress", "Storage backend calls currently running", "gauge", QUERY_LABELS)
+
+updates_throttled = Metric("bot_updates_throttled_total", "Updates dropped by flood control, by the limit they hit", "counter", ("limit",))
+
+REGISTRY = (
+    handler_latency, handler_calls, handler_errors, handler_in_progress,
+    query_latency, query_calls, query_errors, query_in_progress,
+    updates_throttled,
+)
+
+# Time an awaited call and record it under `labels` in one family of metrics
+async def _track(labels: tuple, latency: Histogram, calls: Metric, errors: Metric, in_progress: Metric, call):
+    calls.inc(labels)
+    in_progress.inc(labels)
+    start = time.perf_counter()
+    try:
+        return await call()
+    except ApplicationHandlerStop:
+        raise
+    except Exception:
+        errors.inc(labels)
+        raise
+    finally:
+        latency.observe(labels, time.perf_counter() - start)
+        in_progress.dec(labels)
+
+# Decorator for repository functions: record each call under its table and function name
+def timed_query(table: str):
+    def decorator(fn):
+        labels = (table, fn.__name__)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await _track(labels, query_latency, query_calls, query_errors, query_in_progress, lambda: fn(*args, **kwargs))
+        return wrapper
+    return decorator
+
+def instrument_callback(callback, name: str | None = None):
+    labels = (name or callback.__name__,)
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        return await _track(labels, handler_latency, handler_calls, handler_errors, handler_in_progress, lambda: callback(update, context))
+    wrapper.instrumented = True
+    return wrapper
+
+# Wrap the callback of every handler registered on the application, including those inside conversations
+def instrument_handlers(application: Application):
+    def instrument(handler):
+        if isinstance(handler, ConversationHandler):
+            for inner in handler.entry_points + handler.fallbacks:
+                instrument(inner)
+            for state_handlers in handler.states.values():
+                for inner in state_handlers:
+                    instrument(inner)
+        elif not getattr(handler.callback, "instrumented", False):
+            handler.callback = instrument_callback(handler.callback)
+
+    for group in application.handlers.values():
+        for handler in group:
+            instrument(handler)
+
+# Prometheus text exposition format
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+# Short plain-text report for the /stats command
+def summary(limit: int = 10) -> str:
+    def section(title: str, latency: Histogram, errors: Metric, in_progress: Metric) -> list:
+        rows = sorted(latency.values.items(), key=lambda item: item[1]["count"], reverse=True)[:limit]
+        if not rows:
+            return [f"{title}: no calls yet"]
+        lines = [f"{title} (calls, errors, avg / p95 ms, running):"]
+        for labels, series in rows:
+            average = series["sum"] / series["count"] * 1000
+            p95 = latency.quantile(labels, 0.95) * 1000
+            lines.append(
+                f"• {'.'.join(labels)}: {series['count']}, {int(errors.values.get(labels, 0))}, "
+                f"{average:.0f} / {p95:.0f}, {int(in_progress.values.get(labels, 0))}"
+            )
+        return lines
+
+    return "\n".join(
+        section("Handlers", handler_latency, handler_errors, handler_in_progress)
+        + [""]
+        + section("Storage", query_latency, query_errors, query_in_progress)
+    )
+
+class _MetricsHandler(RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(render())
+
+_server = None
+
+# Serve /metrics on the bot's event loop
+def start_server(port: int, address: str = "127.0.0.1"):
+    global _server
+    _server = HTTPServer(WebApplication([(r"/metrics", _MetricsHandler)]))
+    _server.listen(port, address)
+    logger.info(f"Serving metrics on http://{address}:{port}/metrics")
+
+async def stop_server():
+    global _server
+    if _server is not None:
+        _server.stop()
+        await _server.close_all_connections()
+        _server = None
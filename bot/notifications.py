@@ -0,0 +1,200 @@
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from telegram import InlineKeyboardMarkup
+from telegram.error import BadRequest, Forbidden, RetryAfter, TimedOut, NetworkError
+import background
+from config import OUTBOX_PATH, OUTBOX_WORKERS, OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS, OUTBOX_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Backoff before sending a failed message again: doubles each attempt, up to the maximum
+SEND_BASE_DELAY = 1.0
+SEND_MAX_DELAY = 300.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id TEXT NOT NULL,
+    method TEXT NOT NULL,
+    params TEXT NOT NULL,
+    description TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_chat_idx ON outbox (chat_id, id);
+"""
+
+# Seconds Telegram asked us to wait in a flood-control (429) response
+def retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+# Describe one Bot API call for the outbox, e.g. message("send_message", chat_id, "order update", text="...")
+def message(method: str, chat_id: int | str, description: str, **params) -> dict:
+    if isinstance(params.get("reply_markup"), InlineKeyboardMarkup):
+        params["reply_markup"] = params["reply_markup"].to_dict()
+    return {"method": method, "chat_id": str(chat_id), "description": description, "params": params}
+
+class Outbox:
+    """Durable queue of outgoing notifications, kept in SQLite.
+
+    Handlers only enqueue messages, which is a local insert, and return. A
+    dispatcher hands the messages that are due to a pool of workers, grouped
+    by chat: each chat is worked on by one worker at a time and its messages
+    go out in the order they were enqueued. A message that fails is retried
+    with exponential backoff and holds back the later messages for its chat
+    until then. Sent messages are removed in one transaction per group.
+    Delivery is at least once: a message sent just before the bot stops may
+    be sent again after a restart.
+    """
+
+    def __init__(self, path: str = OUTBOX_PATH, workers: int = OUTBOX_WORKERS, batch_size: int = OUTBOX_BATCH_SIZE,
+                 max_attempts: int = OUTBOX_MAX_ATTEMPTS):
+        self.path = path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._connection = None
+        self._lock = threading.Lock()
+        self._bot = None
+        self._queue = None
+        self._wakeup = None
+        self._busy_chats = set()
+
+    # Start delivering, including anything left over from the last run
+    def start(self, bot):
+        self._bot = bot
+        self._queue = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        background.start(self._dispatch(), name="outbox-dispatcher")
+        for number in range(self.workers):
+            background.start(self._work(), name=f"outbox-worker-{number}")
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    async def enqueue(self, *messages: dict):
+        await asyncio.to_thread(self._insert, messages)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # Storage, run off the event loop. Callers hold self._lock.
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def _insert(self, messages):
+        now = time.time()
+        with self._lock, self._db() as db:
+            db.executemany(
+                "INSERT INTO outbox (chat_id, method, params, description, next_attempt_at) VALUES (?, ?, ?, ?, ?)",
+                [(m["chat_id"], m["method"], json.dumps(m["params"]), m["description"], now) for m in messages]
+            )
+
+    # Due messages, skipping chats a worker already has and chats whose earlier message is waiting to be retried
+    def _due(self, busy_chats: list) -> list:
+        now = time.time()
+        busy_filter = f"AND o.chat_id NOT IN ({', '.join('?' * len(busy_chats))})" if busy_chats else ""
+        with self._lock:
+            return self._db().execute(f"""
+                SELECT o.id, o.chat_id, o.method, o.params, o.description, o.attempts FROM outbox AS o
+                WHERE o.next_attempt_at <= ? {busy_filter}
+                  AND NOT EXISTS (
+                      SELECT 1 FROM outbox AS earlier
+                      WHERE earlier.chat_id = o.chat_id AND earlier.id < o.id AND earlier.next_attempt_at > ?
+                  )
+                ORDER BY o.id LIMIT ?
+            """, (now, *busy_chats, now, self.batch_size)).fetchall()
+
+    def _finish(self, done_ids: list, retry: tuple | None):
+        with self._lock, self._db() as db:
+            db.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in done_ids])
+            if retry:
+                db.execute("UPDATE outbox SET attempts = ?, next_attempt_at = ? WHERE id = ?", retry)
+
+    # Delivery
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                rows = await asyncio.to_thread(self._due, list(self._busy_chats))
+            except Exception as e:
+                logger.error(f"Error reading the outbox: {e}")
+                rows = []
+            by_chat = {}
+            for row in rows:
+                by_chat.setdefault(row[1], []).append(row)
+            for chat_id, chat_rows in by_chat.items():
+                self._busy_chats.add(chat_id)
+                self._queue.put_nowait((chat_id, chat_rows))
+            # A full batch means more may be due right away
+            if len(rows) < self.batch_size:
+                # asyncio.timeout, unlike wait_for, never swallows a cancel that lands as the wait ends
+                try:
+                    async with asyncio.timeout(OUTBOX_POLL_INTERVAL):
+                        await self._wakeup.wait()
+                except TimeoutError:
+                    pass
+            else:
+                await self._wakeup.wait()
+
+    async def _work(self):
+        while True:
+            chat_id, rows = await self._queue.get()
+            try:
+                await self._deliver(rows)
+            except Exception as e:
+                logger.error(f"Error delivering outbox messages for chat {chat_id}: {e}")
+            finally:
+                self._busy_chats.discard(chat_id)
+            # Not reached when cancelled, so shutdown does not wake the dispatcher
+            self._wakeup.set()
+
+    # Send one chat's messages in order, stopping at the first one that has to be retried later
+    async def _deliver(self, rows: list):
+        done_ids = []
+        retry = None
+        for row_id, chat_id, method, params, description, attempts in rows:
+            delay = await self._send(chat_id, method, json.loads(params), description)
+            if delay is None:
+                done_ids.append(row_id)
+            elif attempts + 1 >= self.max_attempts:
+                logger.error(f"Giving up sending {description} after {attempts + 1} attempts")
+                done_ids.append(row_id)
+            else:
+                retry = (attempts + 1, time.time() + (delay or min(SEND_BASE_DELAY * 2 ** attempts, SEND_MAX_DELAY)), row_id)
+                break
+        await asyncio.to_thread(self._finish, done_ids, retry)
+
+    # None once the message is dealt with, otherwise the delay before retrying (0 for the default backoff)
+    async def _send(self, chat_id: str, method: str, params: dict, description: str) -> float | None:
+        if "reply_markup" in params:
+            params["reply_markup"] = InlineKeyboardMarkup.de_json(params["reply_markup"], self._bot)
+        try:
+            await getattr(self._bot, method)(chat_id=chat_id, **params)
+            return None
+        except RetryAfter as e:
+            return retry_after_seconds(e)
+        except (Forbidden, BadRequest) as e:
+            # The request itself is invalid or the chat is gone; sending it again will not help
+            logger.error(f"Sending {description} failed: {e}")
+            return None
+        except (TimedOut, NetworkError) as e:
+            logger.warning(f"Sending {description} failed: {e}")
+            return 0
+        except Exception as e:
+            logger.error(f"Sending {description} failed: {e}")
+            return 0
+
+outbox = Outbox()
@@ -0,0 +1,62 @@
+import os
+import time
+import threading
+from config import ORDER_ID_WORKER_ID
+
+# Order IDs are 8 base-36 characters (0-9, A-Z) packing, from most to least significant:
+#   30 bits  seconds since ORDER_ID_EPOCH (good for ~34 years)
+#    5 bits  worker ID, so up to 32 bot processes never hand out the same ID
+#    6 bits  per-second sequence within the worker
+# 2^41 fits in 36^8, and because the digits sort before the letters, IDs
+# issued later also sort later as plain strings.
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ORDER_ID_LENGTH = 8
+ORDER_ID_EPOCH = 1735689600  # 2025-01-01T00:00:00Z
+WORKER_BITS = 5
+SEQUENCE_BITS = 6
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+def encode(value: int) -> str:
+    chars = []
+    for _ in range(ORDER_ID_LENGTH):
+        value, digit = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+class OrderIdGenerator:
+    """Generates unique, time-ordered order IDs without a database round trip.
+
+    When a worker issues more than 64 IDs in one second it borrows the next
+    second rather than waiting, so IDs stay unique and ordered and the clock
+    catches up as soon as the burst is over.
+    """
+
+    def __init__(self, worker_id: int):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"Order ID worker ID must be between 0 and {MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self._last_second = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def next_id(self) -> str:
+        with self._lock:
+            second = int(time.time()) - ORDER_ID_EPOCH
+            if second > self._last_second:
+                self._last_second = second
+                self._sequence = 0
+            elif self._sequence < MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                self._last_second += 1
+                self._sequence = 0
+            value = (self._last_second << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+        return encode(value)
+
+# Without an explicit ORDER_ID_WORKER_ID, fall back to the process ID; the rare clash
+# between two processes is caught by the unique constraint and retried
+generator = OrderIdGenerator(ORDER_ID_WORKER_ID if ORDER_ID_WORKER_ID is not None else os.getpid() % (MAX_WORKER_ID + 1))
+
+def generate_order_string() -> str:
+    return generator.next_id()
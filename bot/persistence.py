@@ -0,0 +1,148 @@
+import json
+import asyncio
+import logging
+import sqlite3
+from telegram.ext import BasePersistence, PersistenceInput, PicklePersistence
+from config import PERSISTENCE_BACKEND, PERSISTENCE_PATH, PERSISTENCE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (
+    user_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (name, key)
+);
+"""
+
+class SQLitePersistence(BasePersistence):
+    """Keeps user_data (the cart and checkout details) and conversation states in SQLite.
+
+    The Application hands over changed entries every `update_interval` seconds.
+    They are buffered and written in one transaction per run, off the event
+    loop, so saving state never adds latency to handling a message.
+    """
+
+    def __init__(self, path: str = PERSISTENCE_PATH, update_interval: float = PERSISTENCE_INTERVAL):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._dirty_users = {}
+        self._dirty_conversations = {}
+        self._write_task = None
+
+    # Loading
+
+    async def get_user_data(self) -> dict:
+        rows = self._connection.execute("SELECT user_id, data FROM user_data").fetchall()
+        return {user_id: json.loads(data) for user_id, data in rows}
+
+    async def get_conversations(self, name: str) -> dict:
+        rows = self._connection.execute("SELECT key, state FROM conversations WHERE name = ?", (name,)).fetchall()
+        return {tuple(json.loads(key)): json.loads(state) for key, state in rows}
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    # Buffered writes
+
+    async def update_user_data(self, user_id: int, data: dict):
+        self._dirty_users[user_id] = data or None
+        self._schedule_write()
+
+    async def drop_user_data(self, user_id: int):
+        self._dirty_users[user_id] = None
+        self._schedule_write()
+
+    async def update_conversation(self, name: str, key: tuple, new_state):
+        self._dirty_conversations[(name, key)] = new_state
+        self._schedule_write()
+
+    async def update_chat_data(self, chat_id: int, data: dict):
+        pass
+
+    async def drop_chat_data(self, chat_id: int):
+        pass
+
+    async def update_bot_data(self, data: dict):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def refresh_user_data(self, user_id: int, user_data: dict):
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict):
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict):
+        pass
+
+    # The Application calls every update_* method of one run before this task gets to run,
+    # so a single write covers the whole batch
+    def _schedule_write(self):
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.create_task(self._write_dirty())
+
+    async def _write_dirty(self):
+        # Loop so entries that arrive while a write is in progress are not left behind
+        while self._dirty_users or self._dirty_conversations:
+            users, self._dirty_users = self._dirty_users, {}
+            conversations, self._dirty_conversations = self._dirty_conversations, {}
+            await asyncio.to_thread(self._write, users, conversations)
+
+    def _write(self, users: dict, conversations: dict):
+        with self._connection:
+            for user_id, data in users.items():
+                if data is None:
+                    self._connection.execute("DELETE FROM user_data WHERE user_id = ?", (user_id,))
+                else:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO user_data (user_id, data) VALUES (?, ?)",
+                        (user_id, json.dumps(data, default=str))
+                    )
+            for (name, key), state in conversations.items():
+                if state is None:
+                    self._connection.execute("DELETE FROM conversations WHERE name = ? AND key = ?", (name, json.dumps(key)))
+                else:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)",
+                        (name, json.dumps(key), json.dumps(state))
+                    )
+        logger.debug(f"Persisted {len(users)} users and {len(conversations)} conversation states")
+
+    async def flush(self):
+        if self._write_task is not None:
+            await self._write_task
+        await self._write_dirty()
+        self._connection.close()
+
+# Build the persistence backend selected by PERSISTENCE_BACKEND ("sqlite", "pickle" or "none")
+def create_persistence(backend: str = PERSISTENCE_BACKEND) -> BasePersistence | None:
+    if backend == "sqlite":
+        return SQLitePersistence()
+    if backend == "pickle":
+        return PicklePersistence(
+            PERSISTENCE_PATH,
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=PERSISTENCE_INTERVAL,
+        )
+    if backend == "none":
+        return None
+    raise ValueError(f"Unknown PERSISTENCE_BACKEND: {backend}")
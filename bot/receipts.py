@@ -0,0 +1,159 @@
+import io
+import json
+import asyncio
+import logging
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from config import RECEIPT_POOL, RECEIPT_WORKERS, RECEIPT_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+WIDTH, HEIGHT = letter
+LEFT = 1*inch
+TITLE_FONT = ("Helvetica-Bold", 20)
+SECTION_FONT = ("Helvetica-Bold", 14)
+BODY_FONT = ("Helvetica", 12)
+TOTAL_FONT = ("Helvetica-Bold", 14)
+DELIVERY_FONT = ("Helvetica-Bold", 12)
+LINE = 0.25*inch
+ROW = 0.3*inch
+GAP = 0.5*inch
+
+# Baselines of the fixed lines, and each per-order field's label (part of the template)
+TITLE_Y = HEIGHT - 1*inch
+ORDER_ID_Y = HEIGHT - 1.5*inch
+DATE_Y = ORDER_ID_Y - ROW
+CUSTOMER_Y = DATE_Y - GAP
+NAME_Y = CUSTOMER_Y - ROW
+PHONE_Y = NAME_Y - LINE
+ADDRESS_Y = PHONE_Y - LINE
+ITEMS_Y = ADDRESS_Y - GAP
+FIELDS = {
+    'order_id': ("Order ID: ", ORDER_ID_Y),
+    'date': ("Date: ", DATE_Y),
+    'name': ("Name: ", NAME_Y),
+    'phone': ("Phone: ", PHONE_Y),
+    'address': ("Address: ", ADDRESS_Y),
+}
+# Values are drawn right after their label
+VALUE_X = {field: LEFT + stringWidth(label, *BODY_FONT) for field, (label, _) in FIELDS.items()}
+
+# The parts every receipt shares (title, section headings and field labels), compiled once per
+# process into PDF text operators that each receipt adds to its page as they are
+def _compile_template() -> str:
+    c = canvas.Canvas(io.BytesIO(), pagesize=letter)
+    _register_fonts(c)
+    text = c.beginText()
+    for font, y, line in [
+        (TITLE_FONT, TITLE_Y, "ORDER RECEIPT"),
+        (SECTION_FONT, CUSTOMER_Y, "Customer Information"),
+        (SECTION_FONT, ITEMS_Y, "Order Items"),
+        *((BODY_FONT, y, label) for label, y in FIELDS.values()),
+    ]:
+        text.setFont(*font)
+        text.setTextOrigin(LEFT, y)
+        text.textOut(line)
+    return text.getCode()
+
+# Fonts are named in the PDF in the order a document first uses them, so every receipt
+# registers them in the same order as the template was compiled with
+def _register_fonts(c: canvas.Canvas):
+    for font in (TITLE_FONT, BODY_FONT):
+        c.setFont(*font)
+
+TEMPLATE = _compile_template()
+
+def _format_address(address) -> str:
+    if isinstance(address, str):
+        address = json.loads(address)
+    return f"{address.get('house_no', '')}, {address.get('street', '')}, {address.get('ward', '')}, {address.get('township', '')}, {address.get('city', '')}"
+
+# Orders read back from the database carry their own timestamp; new ones use the current time
+def _format_date(created_at) -> str:
+    if created_at:
+        return str(created_at)[:19].replace('T', ' ')
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+# Generate PDF receipt: the compiled template, then the per-order fields in one text object
+def generate_pdf_receipt(order_data: dict) -> bytes:
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    _register_fonts(c)
+    c.addLiteral(TEMPLATE)
+
+    items = order_data.get('items', [])
+    if isinstance(items, str):
+        items = json.loads(items)
+
+    text = c.beginText()
+    text.setFont(*BODY_FONT)
+    values = {
+        'order_id': order_data.get('order_string', 'N/A'),
+        'date': _format_date(order_data.get('created_at')),
+        'name': order_data.get('user_name', 'N/A'),
+        'phone': order_data.get('phone', 'N/A'),
+        'address': _format_address(order_data.get('address', {})),
+    }
+    for field, value in values.items():
+        text.setTextOrigin(VALUE_X[field], FIELDS[field][1])
+        text.textOut(str(value))
+
+    # Items
+    y = ITEMS_Y - ROW
+    for item in items:
+        text.setTextOrigin(LEFT, y)
+        text.textOut(f"• {item['product_name']} x {item['quantity']} - {float(item['price']) * item['quantity']:.2f}")
+        y -= LINE
+
+    y -= ROW
+    text.setFont(*DELIVERY_FONT)
+    text.setTextOrigin(LEFT, y)
+    text.textOut(f"Delivery Type: {order_data.get('delivery_type', 'N/A').replace('_', ' ').title()}")
+    y -= ROW
+    text.setFont(*TOTAL_FONT)
+    text.setTextOrigin(LEFT, y)
+    text.textOut(f"TOTAL: {float(order_data.get('total_cost', 0)):.2f}")
+    c.drawText(text)
+
+    c.save()
+    return buffer.getvalue()
+
+class ReceiptRenderer:
+    """Renders receipts on a worker pool so ReportLab never runs on the event loop.
+
+    At most `queue_size` receipts are waiting or rendering at once; further
+    callers wait for a free slot instead of piling work onto the pool.
+    """
+
+    def __init__(self, pool: str = RECEIPT_POOL, workers: int = RECEIPT_WORKERS, queue_size: int = RECEIPT_QUEUE_SIZE):
+        self.pool = pool
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = None
+        self._slots = None
+
+    def start(self):
+        if self.pool == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="receipt")
+        self._slots = asyncio.Semaphore(self.queue_size)
+        logger.info(f"Receipt renderer started: {self.workers} {self.pool} workers, queue size {self.queue_size}")
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def render(self, order_data: dict) -> bytes:
+        if self._executor is None:
+            self.start()
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, generate_pdf_receipt, order_data)
+
+renderer = ReceiptRenderer()
@@ -0,0 +1,131 @@
+import logging
+from storage import StorageBackend, DuplicateKeyError, OutOfStockError
+from supabase_backend import SupabaseBackend
+from sqlite_backend import SQLiteBackend
+from config import STORAGE_BACKEND
+from metrics import timed_query
+
+logger = logging.getLogger(__name__)
+
+_backend: StorageBackend = None
+
+# Build the storage backend selected by STORAGE_BACKEND ("supabase" or "sqlite")
+def create_backend(backend: str = STORAGE_BACKEND, supabase_url: str = "", supabase_key: str = "") -> StorageBackend:
+    if backend == "supabase":
+        return SupabaseBackend(supabase_url, supabase_key)
+    if backend == "sqlite":
+        return SQLiteBackend()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+# Route every query below to `backend`
+def configure(backend: StorageBackend):
+    global _backend
+    _backend = backend
+    logger.info(f"Repository using {type(backend).__name__}")
+
+def _get_backend() -> StorageBackend:
+    if _backend is None:
+        raise RuntimeError("Repository is not configured. Call repository.configure() first.")
+    return _backend
+
+async def close():
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+# Profiles
+
+@timed_query("profiles")
+async def get_ban_status(telegram_user_id: int) -> bool:
+    return await _get_backend().get_ban_status(telegram_user_id)
+
+@timed_query("profiles")
+async def get_banned_user_ids() -> list:
+    return await _get_backend().get_banned_user_ids()
+
+# Products
+
+@timed_query("products")
+async def get_product_page(offset: int, limit: int, with_count: bool = True) -> tuple[list, int | None]:
+    return await _get_backend().get_product_page(offset, limit, with_count)
+
+@timed_query("products")
+async def get_product(product_id: str, active_only: bool = False) -> dict | None:
+    return await _get_backend().get_product(product_id, active_only)
+
+# Full rows of several products at once (e.g. everything in a cart); missing ones are left out
+@timed_query("products")
+async def get_products(product_ids: list) -> list:
+    return await _get_backend().get_products(product_ids)
+
+# Product rows changed since `since` (all of them when None), for the search index
+@timed_query("products")
+async def get_products_changed_since(since: str | None) -> list:
+    return await _get_backend().get_products_changed_since(since)
+
+@timed_query("products")
+async def get_active_product_ids() -> list:
+    return await _get_backend().get_active_product_ids()
+
+# Orders
+
+# Take the user's holds, decrement stock for the rest, insert the order and upsert the profile in one transaction
+@timed_query("orders")
+async def place_order(order_data: dict, username: str | None) -> dict:
+    return await _get_backend().place_order(order_data, username)
+
+@timed_query("orders")
+async def get_order(order_string: str) -> dict | None:
+    return await _get_backend().get_order(order_string)
+
+@timed_query("orders")
+async def update_order(order_string: str, changes: dict):
+    await _get_backend().update_order(order_string, changes)
+
+# Apply `changes` only if the order is still in `from_status`. Returns the customer's
+# telegram_user_id, or None when the order does not exist or was already moved on.
+@timed_query("orders")
+async def transition_order_status(order_string: str, from_status: str, changes: dict) -> int | None:
+    return await _get_backend().transition_order_status(order_string, from_status, changes)
+
+# One page of order history, newest first, starting after the (created_at, id) keyset `before`
+@timed_query("orders")
+async def get_user_orders(telegram_user_id: int, limit: int = 10, before: tuple | None = None) -> list:
+    return await _get_backend().get_user_orders(telegram_user_id, limit, before)
+
+# Stock reservations
+
+# Hold `quantity` of a product for the user for `ttl` seconds; raises OutOfStockError
+@timed_query("stock_reservations")
+async def reserve_stock(telegram_user_id: int, product_id: str, quantity: int, ttl: int) -> dict:
+    return await _get_backend().reserve_stock(telegram_user_id, product_id, quantity, ttl)
+
+@timed_query("stock_reservations")
+async def release_reservations(telegram_user_id: int) -> int:
+    return await _get_backend().release_reservations(telegram_user_id)
+
+@timed_query("stock_reservations")
+async def release_expired_reservations(limit: int) -> int:
+    return await _get_backend().release_expired_reservations(limit)
+
+# Broadcasts
+
+# Oldest unfinished broadcast, preferring one that was interrupted mid-send
+@timed_query("broadcast_messages")
+async def get_next_broadcast() -> dict | None:
+    return await _get_backend().get_next_broadcast()
+
+# Move a broadcast from pending to sending; False if something else already did
+@timed_query("broadcast_messages")
+async def claim_broadcast(broadcast_id: str, changes: dict) -> bool:
+    return await _get_backend().claim_broadcast(broadcast_id, changes)
+
+@timed_query("broadcast_messages")
+async def update_broadcast(broadcast_id: str, changes: dict):
+    await _get_backend().update_broadcast(broadcast_id, changes)
+
+# Next `limit` non-banned recipients after `after_id`, in telegram_user_id order
+@timed_query("profiles")
+async def get_broadcast_recipients(after_id: int | None, limit: int) -> list:
+    return await _get_backend().get_broadcast_recipients(after_id, limit)
@@ -0,0 +1,184 @@
+import re
+import time
+import heapq
+import bisect
+import asyncio
+import logging
+import repository
+
+logger = logging.getLogger(__name__)
+
+# How much a query term matching each field counts towards a product's score
+FIELD_WEIGHTS = {"product_id": 4.0, "name": 3.0, "description": 1.0}
+
+# A term that is only a prefix of a word, or only close to one, counts for less
+PREFIX_FACTOR = 0.7
+FUZZY_FACTOR = 0.5
+# Minimum trigram similarity (Jaccard) for a misspelt term to match a word; words one typo
+# away (a letter added, dropped, changed or two swapped) match regardless
+MIN_SIMILARITY = 0.4
+
+def tokenize(text: str | None) -> list:
+    return re.findall(r"\w+", (text or "").lower())
+
+def trigrams(token: str) -> set:
+    padded = f"^{token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def one_edit_apart(a: str, b: str) -> bool:
+    if abs(len(a) - len(b)) > 1 or a == b:
+        return False
+    start = 0
+    while start < min(len(a), len(b)) and a[start] == b[start]:
+        start += 1
+    if len(a) == len(b):
+        # One substituted letter, or two neighbours swapped
+        return a[start + 1:] == b[start + 1:] or (a[start + 2:] == b[start + 2:] and a[start:start + 2] == b[start:start + 2][::-1])
+    shorter, longer = (a, b) if len(a) < len(b) else (b, a)
+    return shorter[start:] == longer[start + 1:]
+
+class ProductIndex:
+    """In-memory inverted index over product id, name and description.
+
+    Each word maps to the products containing it, with a weight for the field
+    it came from. Query terms match words exactly, as a prefix, or, failing
+    both, through a trigram index of the vocabulary, so "shose" still finds
+    "shoes". Every term must match for a product to be returned.
+
+    refresh() keeps the index in step with the products table by fetching
+    only rows whose updated_at moved since the last refresh, plus the list
+    of active ids so deleted products drop out.
+    """
+
+    def __init__(self):
+        self.products = {}
+        self._words = {}
+        self._postings = {}
+        self._trigrams = {}
+        self._vocabulary = None
+        self._synced_at = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    # Index one product row, replacing whatever was indexed for it before
+    def add(self, row: dict):
+        product_id = row["product_id"]
+        self.remove(product_id)
+        if not row.get("is_active", True):
+            return
+        words = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(row.get(field)):
+                words[token] = max(words.get(token, 0.0), weight)
+        for token, weight in words.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                for trigram in trigrams(token):
+                    self._trigrams.setdefault(trigram, set()).add(token)
+                self._vocabulary = None
+            postings[product_id] = weight
+        self._words[product_id] = words
+        self.products[product_id] = {"product_id": product_id, "name": row["name"], "price": row["price"]}
+
+    def remove(self, product_id: str):
+        words = self._words.pop(product_id, None)
+        if words is None:
+            return
+        del self.products[product_id]
+        for token in words:
+            postings = self._postings[token]
+            del postings[product_id]
+            if not postings:
+                del self._postings[token]
+                for trigram in trigrams(token):
+                    tokens = self._trigrams[trigram]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._trigrams[trigram]
+                self._vocabulary = None
+
+    # Sorted vocabulary for prefix lookups, rebuilt after words are added or removed
+    def _sorted_vocabulary(self) -> list:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        return self._vocabulary
+
+    # Best score each product gets for one query term
+    def _match_term(self, term: str) -> dict:
+        exact = self._postings.get(term, {})
+
+        vocabulary = self._sorted_vocabulary()
+        start = bisect.bisect_left(vocabulary, term)
+        longer = []
+        for token in vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            if token != term:
+                longer.append(token)
+        if exact and not longer:
+            return exact
+
+        scores = {}
+        for token in longer:
+            for product_id, weight in self._postings[token].items():
+                scores[product_id] = max(scores.get(product_id, 0.0), weight * PREFIX_FACTOR)
+        scores.update(exact)
+
+        if not scores and len(term) >= 3:
+            term_trigrams = trigrams(term)
+            shared = {}
+            for trigram in term_trigrams:
+                for token in self._trigrams.get(trigram, ()):
+                    shared[token] = shared.get(token, 0) + 1
+            for token, count in shared.items():
+                similarity = count / (len(term_trigrams) + len(trigrams(token)) - count)
+                if one_edit_apart(term, token):
+                    similarity = max(similarity, MIN_SIMILARITY)
+                elif similarity < MIN_SIMILARITY:
+                    continue
+                for product_id, weight in self._postings[token].items():
+                    scores[product_id] = max(scores.get(product_id, 0.0), weight * FUZZY_FACTOR * similarity)
+        return scores
+
+    # Products matching every term of `query`, best first, skipping the first `offset`.
+    # An empty query lists every product in product_id order.
+    def search(self, query: str, limit: int = 10, offset: int = 0) -> list:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [self.products[product_id] for product_id in heapq.nsmallest(offset + limit, self.products)[offset:]]
+        totals = None
+        for term in terms:
+            scores = self._match_term(term)
+            if totals is None:
+                totals = scores
+            else:
+                smaller, larger = (scores, totals) if len(scores) < len(totals) else (totals, scores)
+                totals = {product_id: score + larger[product_id] for product_id, score in smaller.items() if product_id in larger}
+            if not totals:
+                return []
+        ranked = heapq.nsmallest(offset + limit, [(-score, product_id) for product_id, score in totals.items()])
+        return [self.products[product_id] for _, product_id in ranked[offset:]]
+
+    # Apply product changes since the last refresh (everything on the first call)
+    async def refresh(self):
+        async with self._lock:
+            start = time.perf_counter()
+            rows = await repository.get_products_changed_since(self._synced_at)
+            for row in rows:
+                self.add(row)
+                if row.get("updated_at") and (self._synced_at is None or row["updated_at"] > self._synced_at):
+                    self._synced_at = row["updated_at"]
+            active_ids = set(await repository.get_active_product_ids())
+            removed = [product_id for product_id in self.products if product_id not in active_ids]
+            for product_id in removed:
+                self.remove(product_id)
+            if rows or removed:
+                logger.info(
+                    f"Search index updated: {len(rows)} changed, {len(removed)} removed, {len(self.products)} products "
+                    f"({(time.perf_counter() - start) * 1000:.1f} ms)"
+                )
+
+index = ProductIndex()
@@ -0,0 +1,403 @@
+import json
+import uuid
+import asyncio
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from storage import StorageBackend, DuplicateKeyError, OutOfStockError
+from config import SQLITE_PATH
+
+logger = logging.getLogger(__name__)
+
+# The Supabase tables the bot uses (database_schema.sql plus the migrations), in SQLite types.
+# UUIDs and timestamps are stored as text, JSONB as JSON text and booleans as 0/1.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    product_id TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    description TEXT,
+    price NUMERIC NOT NULL,
+    stock INTEGER NOT NULL DEFAULT 0,
+    image_url TEXT,
+    is_active INTEGER DEFAULT 1,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    id TEXT PRIMARY KEY,
+    telegram_user_id INTEGER UNIQUE,
+    username TEXT,
+    phone TEXT,
+    is_banned INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id TEXT PRIMARY KEY,
+    order_string TEXT UNIQUE NOT NULL,
+    telegram_user_id INTEGER NOT NULL,
+    user_name TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    address TEXT NOT NULL,
+    items TEXT NOT NULL,
+    total_cost NUMERIC NOT NULL,
+    delivery_type TEXT NOT NULL CHECK (delivery_type IN ('express_cars', 'delivery_company')),
+    payment_image_url TEXT,
+    receipt_file_id TEXT,
+    status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'approved', 'rejected', 'delivered')),
+    approved_by TEXT,
+    approved_at TEXT,
+    rejection_reason TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE TABLE IF NOT EXISTS user_roles (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    role TEXT NOT NULL DEFAULT 'user' CHECK (role IN ('admin', 'user')),
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    UNIQUE (user_id, role)
+);
+CREATE TABLE IF NOT EXISTS broadcast_messages (
+    id TEXT PRIMARY KEY,
+    message TEXT NOT NULL,
+    sent_by TEXT REFERENCES profiles(id),
+    sent_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    recipient_count INTEGER DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'sent', 'skipped')),
+    last_recipient_id INTEGER,
+    failed_count INTEGER NOT NULL DEFAULT 0,
+    started_at TEXT,
+    completed_at TEXT
+);
+CREATE TABLE IF NOT EXISTS stock_reservations (
+    id TEXT PRIMARY KEY,
+    telegram_user_id INTEGER NOT NULL,
+    product_id TEXT NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    expires_at TEXT NOT NULL,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS idx_products_updated_at ON products(updated_at);
+CREATE TRIGGER IF NOT EXISTS update_products_updated_at AFTER UPDATE ON products
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE products SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE id = NEW.id;
+END;
+CREATE INDEX IF NOT EXISTS idx_orders_user_history ON orders(telegram_user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
+CREATE INDEX IF NOT EXISTS idx_products_is_active ON products(is_active, product_id);
+CREATE INDEX IF NOT EXISTS idx_profiles_is_banned ON profiles(is_banned, telegram_user_id);
+CREATE INDEX IF NOT EXISTS idx_broadcast_messages_status ON broadcast_messages(status, sent_at);
+CREATE INDEX IF NOT EXISTS idx_stock_reservations_user ON stock_reservations(telegram_user_id, product_id);
+CREATE INDEX IF NOT EXISTS idx_stock_reservations_expires_at ON stock_reservations(expires_at);
+"""
+
+JSON_COLUMNS = {"address", "items"}
+BOOL_COLUMNS = {"is_active", "is_banned"}
+
+BROADCAST_COLUMNS = "id, message, status, last_recipient_id, recipient_count, failed_count"
+
+def _row(row: sqlite3.Row) -> dict:
+    data = dict(row)
+    for column in JSON_COLUMNS & data.keys():
+        data[column] = json.loads(data[column])
+    for column in BOOL_COLUMNS & data.keys():
+        data[column] = bool(data[column])
+    return data
+
+def _value(value):
+    return json.dumps(value) if isinstance(value, (dict, list)) else value
+
+class SQLiteBackend(StorageBackend):
+    """Shop data in a local SQLite file, for running without Supabase.
+
+    One connection serves every call on a single worker thread, so calls never
+    block the event loop and SQLite sees one writer at a time. The web admin
+    panel cannot see this data; manage products with any SQLite client.
+    """
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.executescript(SCHEMA)
+        self._columns = {
+            table: {row["name"] for row in self._connection.execute(f"PRAGMA table_info({table})")}
+            for table in ("products", "profiles", "orders", "broadcast_messages")
+        }
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        logger.info(f"SQLite backend using {path}")
+
+    async def close(self):
+        await self._run(self._connection.close)
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _fetch_one(self, sql: str, params: tuple = ()) -> dict | None:
+        row = self._connection.execute(sql, params).fetchone()
+        return _row(row) if row else None
+
+    def _fetch_all(self, sql: str, params: tuple = ()) -> list:
+        return [_row(row) for row in self._connection.execute(sql, params)]
+
+    # "SET a = ?, b = ?" for a changes dict, refusing columns the table does not have
+    def _assignments(self, table: str, changes: dict) -> tuple[str, tuple]:
+        unknown = changes.keys() - self._columns[table]
+        if unknown:
+            raise ValueError(f"Unknown {table} columns: {', '.join(sorted(unknown))}")
+        columns = ", ".join(f"{column} = ?" for column in changes)
+        return f"SET {columns}", tuple(_value(value) for value in changes.values())
+
+    # Insert or update products by product_id; the bot never writes products itself, so
+    # this is how a local shop (or a benchmark) loads its catalog
+    def upsert_products(self, products: list):
+        self._connection.execute("BEGIN")
+        try:
+            for product in products:
+                product = {"id": str(uuid.uuid4()), **product}
+                unknown = product.keys() - self._columns["products"]
+                if unknown:
+                    raise ValueError(f"Unknown products columns: {', '.join(sorted(unknown))}")
+                columns = ", ".join(product)
+                updates = ", ".join(f"{column} = excluded.{column}" for column in product if column not in ("id", "product_id"))
+                self._connection.execute(
+                    f"INSERT INTO products ({columns}) VALUES ({', '.join('?' * len(product))}) "
+                    f"ON CONFLICT (product_id) DO UPDATE SET {updates}",
+                    tuple(_value(value) for value in product.values())
+                )
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        self._connection.execute("COMMIT")
+
+    # Profiles
+
+    async def get_ban_status(self, telegram_user_id: int) -> bool:
+        row = await self._run(self._fetch_one, "SELECT is_banned FROM profiles WHERE telegram_user_id = ?", (telegram_user_id,))
+        return bool(row and row["is_banned"])
+
+    async def get_banned_user_ids(self) -> list:
+        rows = await self._run(self._fetch_all, "SELECT telegram_user_id FROM profiles WHERE is_banned = 1 AND telegram_user_id IS NOT NULL")
+        return [row["telegram_user_id"] for row in rows]
+
+    # Products
+
+    async def get_product_page(self, offset: int, limit: int, with_count: bool = True) -> tuple[list, int | None]:
+        def _fetch():
+            rows = self._fetch_all(
+                "SELECT product_id, name, price FROM products WHERE is_active = 1 ORDER BY product_id LIMIT ? OFFSET ?",
+                (limit, offset)
+            )
+            count = self._connection.execute("SELECT COUNT(*) FROM products WHERE is_active = 1").fetchone()[0] if with_count else None
+            return rows, count
+        return await self._run(_fetch)
+
+    async def get_product(self, product_id: str, active_only: bool = False) -> dict | None:
+        sql = "SELECT * FROM products WHERE product_id = ?" + (" AND is_active = 1" if active_only else "")
+        return await self._run(self._fetch_one, sql, (product_id,))
+
+    async def get_products(self, product_ids: list) -> list:
+        if not product_ids:
+            return []
+        return await self._run(self._fetch_all, f"SELECT * FROM products WHERE product_id IN ({', '.join('?' * len(product_ids))})", tuple(product_ids))
+
+    async def get_products_changed_since(self, since: str | None) -> list:
+        sql = "SELECT product_id, name, description, price, is_active, updated_at FROM products"
+        if since is None:
+            return await self._run(self._fetch_all, sql + " ORDER BY updated_at, product_id")
+        return await self._run(self._fetch_all, sql + " WHERE updated_at >= ? ORDER BY updated_at, product_id", (since,))
+
+    async def get_active_product_ids(self) -> list:
+        rows = await self._run(self._fetch_all, "SELECT product_id FROM products WHERE is_active = 1 ORDER BY product_id")
+        return [row["product_id"] for row in rows]
+
+    # Orders
+
+    # Same steps as the place_order database function, in one IMMEDIATE transaction
+    def _place_order(self, order_data: dict, username: str | None) -> dict:
+        items = order_data["items"]
+        if not items:
+            raise ValueError("empty_cart")
+        if any(item["quantity"] <= 0 for item in items):
+            raise ValueError("invalid_quantity")
+        quantities = {}
+        for item in items:
+            quantities[item["product_id"]] = quantities.get(item["product_id"], 0) + item["quantity"]
+
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            prices = {}
+            held, _ = self._delete_holds(
+                f"telegram_user_id = ? AND product_id IN ({', '.join('?' * len(quantities))})",
+                (order_data["telegram_user_id"], *quantities)
+            )
+            for product_id in sorted(quantities):
+                # Negative when the holds cover more than was ordered, which returns the rest
+                needed = quantities[product_id] - held.get(product_id, 0)
+                row = connection.execute(
+                    "UPDATE products SET stock = stock - ? WHERE product_id = ? AND is_active = 1 AND stock >= ? RETURNING price",
+                    (needed, product_id, needed)
+                ).fetchone()
+                if row is None:
+                    raise OutOfStockError(product_id)
+                prices[product_id] = row["price"]
+            # Charge what the products cost now, not what the cart says
+            items = [{**item, "price": prices[item["product_id"]]} for item in items]
+            total_cost = sum(item["quantity"] * item["price"] for item in items)
+            try:
+                connection.execute(
+                    "INSERT INTO orders (id, order_string, telegram_user_id, user_name, phone, address, items, total_cost, delivery_type, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending')",
+                    (
+                        str(uuid.uuid4()), order_data["order_string"], order_data["telegram_user_id"], order_data["user_name"],
+                        order_data["phone"], json.dumps(order_data["address"]), json.dumps(items), total_cost, order_data["delivery_type"],
+                    )
+                )
+            except sqlite3.IntegrityError as e:
+                if "orders.order_string" in str(e):
+                    raise DuplicateKeyError(str(e)) from e
+                raise
+            connection.execute(
+                "INSERT INTO profiles (id, telegram_user_id, username, phone) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (telegram_user_id) DO UPDATE SET username = excluded.username, phone = excluded.phone",
+                (str(uuid.uuid4()), order_data["telegram_user_id"], username, order_data["phone"])
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return {"order_string": order_data["order_string"], "total_cost": total_cost, "items": items}
+
+    async def place_order(self, order_data: dict, username: str | None) -> dict:
+        return await self._run(self._place_order, order_data, username)
+
+    async def get_order(self, order_string: str) -> dict | None:
+        return await self._run(self._fetch_one, "SELECT * FROM orders WHERE order_string = ?", (order_string,))
+
+    async def update_order(self, order_string: str, changes: dict):
+        assignments, params = self._assignments("orders", changes)
+        await self._run(self._connection.execute, f"UPDATE orders {assignments} WHERE order_string = ?", (*params, order_string))
+
+    async def transition_order_status(self, order_string: str, from_status: str, changes: dict) -> int | None:
+        assignments, params = self._assignments("orders", changes)
+        row = await self._run(
+            self._fetch_one,
+            f"UPDATE orders {assignments} WHERE order_string = ? AND status = ? RETURNING telegram_user_id",
+            (*params, order_string, from_status)
+        )
+        return row["telegram_user_id"] if row else None
+
+    async def get_user_orders(self, telegram_user_id: int, limit: int = 10, before: tuple | None = None) -> list:
+        sql = "SELECT id, order_string, status, total_cost, created_at FROM orders WHERE telegram_user_id = ?"
+        params = (telegram_user_id,)
+        if before is not None:
+            sql += " AND (created_at, id) < (?, ?)"
+            params += tuple(before)
+        return await self._run(self._fetch_all, sql + " ORDER BY created_at DESC, id DESC LIMIT ?", (*params, limit))
+
+    # Stock reservations
+
+    # Delete the holds matching `where`; returns the quantities they held per product_id and how
+    # many there were. Must run inside a transaction.
+    def _delete_holds(self, where: str, params: tuple) -> tuple[dict, int]:
+        rows = self._connection.execute(f"DELETE FROM stock_reservations WHERE {where} RETURNING product_id, quantity", params).fetchall()
+        held = {}
+        for row in rows:
+            held[row["product_id"]] = held.get(row["product_id"], 0) + row["quantity"]
+        return held, len(rows)
+
+    # Delete the holds matching `where` and put them back into stock; returns how many there were
+    def _release_holds(self, where: str, params: tuple) -> int:
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            held, count = self._delete_holds(where, params)
+            for product_id, quantity in sorted(held.items()):
+                connection.execute("UPDATE products SET stock = stock + ? WHERE product_id = ?", (quantity, product_id))
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return count
+
+    # Same steps as the reserve_stock database function
+    def _reserve_stock(self, telegram_user_id: int, product_id: str, quantity: int, ttl: int) -> dict:
+        if quantity <= 0:
+            raise ValueError("invalid_quantity")
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            expires_at = connection.execute(
+                "SELECT strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now', ?)", (f"+{ttl} seconds",)
+            ).fetchone()[0]
+            connection.execute("UPDATE stock_reservations SET expires_at = ? WHERE telegram_user_id = ?", (expires_at, telegram_user_id))
+            cursor = connection.execute(
+                "UPDATE products SET stock = stock - ? WHERE product_id = ? AND is_active = 1 AND stock >= ?",
+                (quantity, product_id, quantity)
+            )
+            if cursor.rowcount == 0:
+                raise OutOfStockError(product_id)
+            reservation_id = str(uuid.uuid4())
+            connection.execute(
+                "INSERT INTO stock_reservations (id, telegram_user_id, product_id, quantity, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (reservation_id, telegram_user_id, product_id, quantity, expires_at)
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return {"id": reservation_id, "expires_at": expires_at}
+
+    async def reserve_stock(self, telegram_user_id: int, product_id: str, quantity: int, ttl: int) -> dict:
+        return await self._run(self._reserve_stock, telegram_user_id, product_id, quantity, ttl)
+
+    async def release_reservations(self, telegram_user_id: int) -> int:
+        return await self._run(self._release_holds, "telegram_user_id = ?", (telegram_user_id,))
+
+    # One writer at a time, so there is nothing to skip here
+    async def release_expired_reservations(self, limit: int) -> int:
+        return await self._run(
+            self._release_holds,
+            "id IN (SELECT id FROM stock_reservations WHERE expires_at <= strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') "
+            "ORDER BY expires_at LIMIT ?)",
+            (limit,)
+        )
+
+    # Broadcasts
+
+    async def get_next_broadcast(self) -> dict | None:
+        return await self._run(
+            self._fetch_one,
+            f"SELECT {BROADCAST_COLUMNS} FROM broadcast_messages WHERE status IN ('sending', 'pending') "
+            "ORDER BY status DESC, sent_at LIMIT 1"
+        )
+
+    async def claim_broadcast(self, broadcast_id: str, changes: dict) -> bool:
+        assignments, params = self._assignments("broadcast_messages", {**changes, "status": "sending"})
+        row = await self._run(
+            self._fetch_one,
+            f"UPDATE broadcast_messages {assignments} WHERE id = ? AND status = 'pending' RETURNING id",
+            (*params, broadcast_id)
+        )
+        return row is not None
+
+    async def update_broadcast(self, broadcast_id: str, changes: dict):
+        assignments, params = self._assignments("broadcast_messages", changes)
+        await self._run(self._connection.execute, f"UPDATE broadcast_messages {assignments} WHERE id = ?", (*params, broadcast_id))
+
+    async def get_broadcast_recipients(self, after_id: int | None, limit: int) -> list:
+        rows = await self._run(
+            self._fetch_all,
+            "SELECT telegram_user_id FROM profiles WHERE is_banned = 0 AND telegram_user_id IS NOT NULL "
+            "AND telegram_user_id > ? ORDER BY telegram_user_id LIMIT ?",
+            (after_id if after_id is not None else -2**63, limit)
+        )
+        return [row["telegram_user_id"] for row in rows]
@@ -0,0 +1,109 @@
+class DuplicateKeyError(Exception):
+    """Raised when an insert collides with an existing row's unique key."""
+
+class OutOfStockError(Exception):
+    """Raised when an order asks for more of a product than is in stock."""
+
+    def __init__(self, product_id: str):
+        super().__init__(f"Product {product_id} is out of stock")
+        self.product_id = product_id
+
+class StorageBackend:
+    """Everything the bot reads from and writes to the shop database.
+
+    Implementations: SupabaseBackend (supabase_backend.py) for the hosted
+    database shared with the admin panel, and SQLiteBackend (sqlite_backend.py)
+    for a local file. Rows are plain dicts shaped like the Supabase tables.
+    """
+
+    async def close(self):
+        pass
+
+    # Profiles
+
+    async def get_ban_status(self, telegram_user_id: int) -> bool:
+        raise NotImplementedError
+
+    async def get_banned_user_ids(self) -> list:
+        raise NotImplementedError
+
+    # Products
+
+    # Active products ordered by product_id (product_id, name and price only), and the
+    # total number of active products when `with_count` is set
+    async def get_product_page(self, offset: int, limit: int, with_count: bool = True) -> tuple[list, int | None]:
+        raise NotImplementedError
+
+    async def get_product(self, product_id: str, active_only: bool = False) -> dict | None:
+        raise NotImplementedError
+
+    # Full rows of the given products in one query; ids with no product are left out
+    async def get_products(self, product_ids: list) -> list:
+        raise NotImplementedError
+
+    # Products (product_id, name, description, price, is_active, updated_at) whose updated_at is
+    # at or after `since`, oldest change first; every product when `since` is None
+    async def get_products_changed_since(self, since: str | None) -> list:
+        raise NotImplementedError
+
+    async def get_active_product_ids(self) -> list:
+        raise NotImplementedError
+
+    # Orders
+
+    # Take the user's holds on the cart, decrement stock for anything they do not cover, insert
+    # the order and upsert the profile in one transaction. Line prices and the total are taken
+    # from the products table; returns {"order_string", "total_cost", "items"} as stored.
+    # Raises DuplicateKeyError if the order_string is taken and OutOfStockError if stock is short.
+    async def place_order(self, order_data: dict, username: str | None) -> dict:
+        raise NotImplementedError
+
+    async def get_order(self, order_string: str) -> dict | None:
+        raise NotImplementedError
+
+    async def update_order(self, order_string: str, changes: dict):
+        raise NotImplementedError
+
+    # Apply `changes` only if the order is still in `from_status`, atomically. Returns the
+    # customer's telegram_user_id, or None when the order does not exist or was already moved on.
+    async def transition_order_status(self, order_string: str, from_status: str, changes: dict) -> int | None:
+        raise NotImplementedError
+
+    # One page of a user's order history, newest first (id, order_string, status, total_cost and
+    # created_at only). `before` is the (created_at, id) of the last order on the previous page.
+    async def get_user_orders(self, telegram_user_id: int, limit: int = 10, before: tuple | None = None) -> list:
+        raise NotImplementedError
+
+    # Stock reservations
+
+    # Move `quantity` of a product out of stock into a hold for the user that expires in `ttl`
+    # seconds, and extend the user's other holds to match. Returns {"id", "expires_at"}.
+    # Raises OutOfStockError if not enough is left.
+    async def reserve_stock(self, telegram_user_id: int, product_id: str, quantity: int, ttl: int) -> dict:
+        raise NotImplementedError
+
+    # Put all of the user's holds back into stock; returns how many there were
+    async def release_reservations(self, telegram_user_id: int) -> int:
+        raise NotImplementedError
+
+    # Put up to `limit` expired holds back into stock, skipping any another caller is busy with;
+    # returns how many were released
+    async def release_expired_reservations(self, limit: int) -> int:
+        raise NotImplementedError
+
+    # Broadcasts
+
+    # Oldest unfinished broadcast, preferring one that was interrupted mid-send
+    async def get_next_broadcast(self) -> dict | None:
+        raise NotImplementedError
+
+    # Move a broadcast from pending to sending; False if something else already did
+    async def claim_broadcast(self, broadcast_id: str, changes: dict) -> bool:
+        raise NotImplementedError
+
+    async def update_broadcast(self, broadcast_id: str, changes: dict):
+        raise NotImplementedError
+
+    # Next `limit` non-banned recipients after `after_id`, in telegram_user_id order
+    async def get_broadcast_recipients(self, after_id: int | None, limit: int) -> list:
+        raise NotImplementedError
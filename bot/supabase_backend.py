@@ -0,0 +1,193 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from supabase import create_client
+from postgrest.exceptions import APIError
+from storage import StorageBackend, DuplicateKeyError, OutOfStockError
+from config import SUPABASE_MAX_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+# Postgres error code for a unique constraint violation
+UNIQUE_VIOLATION = "23505"
+
+# Columns needed to render a browse page button
+PRODUCT_PAGE_COLUMNS = "product_id,name,price"
+
+# Columns shown in the order history
+ORDER_LIST_COLUMNS = "id,order_string,status,total_cost,created_at"
+
+# Columns the search index is built from
+SEARCH_COLUMNS = "product_id,name,description,price,is_active,updated_at"
+
+# PostgREST returns at most this many rows per request (the Supabase default max-rows)
+MAX_ROWS = 1000
+
+BROADCAST_COLUMNS = "id,message,status,last_recipient_id,recipient_count,failed_count"
+
+class SupabaseBackend(StorageBackend):
+    """Shop data in Supabase, shared with the web admin panel.
+
+    supabase-py is synchronous, so every call runs on a bounded thread pool
+    and at most `max_concurrency` requests are in flight at once.
+    """
+
+    def __init__(self, url: str, key: str, max_concurrency: int = SUPABASE_MAX_CONCURRENCY):
+        self._client = create_client(url, key)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="supabase")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        logger.info(f"Supabase backend configured with max concurrency {max_concurrency}")
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+    # Run a blocking Supabase call on the worker pool without stalling the event loop
+    async def _run(self, fn):
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn)
+
+    # Every row of an ordered query, fetched MAX_ROWS at a time
+    async def _fetch_all_pages(self, build_query) -> list:
+        rows = []
+        while True:
+            offset = len(rows)
+            response = await self._run(lambda: build_query().range(offset, offset + MAX_ROWS - 1).execute())
+            rows.extend(response.data or [])
+            if len(response.data or []) < MAX_ROWS:
+                return rows
+
+    # Profiles
+
+    async def get_ban_status(self, telegram_user_id: int) -> bool:
+        response = await self._run(lambda: self._client.table("profiles").select("is_banned").eq("telegram_user_id", telegram_user_id).execute())
+        return bool(response.data and response.data[0].get("is_banned"))
+
+    async def get_banned_user_ids(self) -> list:
+        response = await self._run(lambda: self._client.table("profiles").select("telegram_user_id").eq("is_banned", True).execute())
+        return [row["telegram_user_id"] for row in response.data or [] if row.get("telegram_user_id") is not None]
+
+    # Products
+
+    async def get_product_page(self, offset: int, limit: int, with_count: bool = True) -> tuple[list, int | None]:
+        def _fetch():
+            query = self._client.table("products").select(PRODUCT_PAGE_COLUMNS, count="exact" if with_count else None)
+            return query.eq("is_active", True).order("product_id").range(offset, offset + limit - 1).execute()
+        response = await self._run(_fetch)
+        return response.data or [], response.count
+
+    async def get_product(self, product_id: str, active_only: bool = False) -> dict | None:
+        def _fetch():
+            query = self._client.table("products").select("*").eq("product_id", product_id)
+            if active_only:
+                query = query.eq("is_active", True)
+            return query.limit(1).execute()
+        response = await self._run(_fetch)
+        return response.data[0] if response.data else None
+
+    async def get_products(self, product_ids: list) -> list:
+        if not product_ids:
+            return []
+        response = await self._run(lambda: self._client.table("products").select("*").in_("product_id", product_ids).execute())
+        return response.data or []
+
+    async def get_products_changed_since(self, since: str | None) -> list:
+        def build_query():
+            query = self._client.table("products").select(SEARCH_COLUMNS)
+            if since is not None:
+                query = query.gte("updated_at", since)
+            return query.order("updated_at").order("product_id")
+        return await self._fetch_all_pages(build_query)
+
+    async def get_active_product_ids(self) -> list:
+        rows = await self._fetch_all_pages(lambda: self._client.table("products").select("product_id").eq("is_active", True).order("product_id"))
+        return [row["product_id"] for row in rows]
+
+    # Orders
+
+    # One call to the place_order database function (supabase/migrations/20251121090000_place_order_function.sql)
+    async def place_order(self, order_data: dict, username: str | None) -> dict:
+        params = {
+            "_order_string": order_data["order_string"],
+            "_telegram_user_id": order_data["telegram_user_id"],
+            "_username": username,
+            "_user_name": order_data["user_name"],
+            "_phone": order_data["phone"],
+            "_address": order_data["address"],
+            "_items": order_data["items"],
+            "_delivery_type": order_data["delivery_type"],
+        }
+        try:
+            response = await self._run(lambda: self._client.rpc("place_order", params).execute())
+        except APIError as e:
+            if e.code == UNIQUE_VIOLATION:
+                raise DuplicateKeyError(e.message) from e
+            if e.message == "out_of_stock":
+                raise OutOfStockError(e.details) from e
+            raise
+        return response.data
+
+    async def get_order(self, order_string: str) -> dict | None:
+        response = await self._run(lambda: self._client.table("orders").select("*").eq("order_string", order_string).limit(1).execute())
+        return response.data[0] if response.data else None
+
+    async def update_order(self, order_string: str, changes: dict):
+        await self._run(lambda: self._client.table("orders").update(changes).eq("order_string", order_string).execute())
+
+    # The status filter and the update are one statement, so concurrent callers cannot both succeed
+    async def transition_order_status(self, order_string: str, from_status: str, changes: dict) -> int | None:
+        response = await self._run(lambda: self._client.table("orders").update(changes).eq("order_string", order_string).eq("status", from_status).select("telegram_user_id").execute())
+        return response.data[0]["telegram_user_id"] if response.data else None
+
+    # Keyset pagination on (created_at, id), served by idx_orders_user_history
+    async def get_user_orders(self, telegram_user_id: int, limit: int = 10, before: tuple | None = None) -> list:
+        def _fetch():
+            query = self._client.table("orders").select(ORDER_LIST_COLUMNS).eq("telegram_user_id", telegram_user_id)
+            if before is not None:
+                created_at, order_id = before
+                query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{order_id})')
+            return query.order("created_at", desc=True).order("id", desc=True).limit(limit).execute()
+        response = await self._run(_fetch)
+        return response.data or []
+
+    # Stock reservations (supabase/migrations/20251124090000_stock_reservations.sql)
+
+    async def reserve_stock(self, telegram_user_id: int, product_id: str, quantity: int, ttl: int) -> dict:
+        params = {"_telegram_user_id": telegram_user_id, "_product_id": product_id, "_quantity": quantity, "_ttl_seconds": ttl}
+        try:
+            response = await self._run(lambda: self._client.rpc("reserve_stock", params).execute())
+        except APIError as e:
+            if e.message == "out_of_stock":
+                raise OutOfStockError(e.details) from e
+            raise
+        return response.data
+
+    async def release_reservations(self, telegram_user_id: int) -> int:
+        response = await self._run(lambda: self._client.rpc("release_reservations", {"_telegram_user_id": telegram_user_id}).execute())
+        return response.data
+
+    async def release_expired_reservations(self, limit: int) -> int:
+        response = await self._run(lambda: self._client.rpc("release_expired_reservations", {"_batch_size": limit}).execute())
+        return response.data
+
+    # Broadcasts
+
+    async def get_next_broadcast(self) -> dict | None:
+        response = await self._run(lambda: self._client.table("broadcast_messages").select(BROADCAST_COLUMNS).in_("status", ["sending", "pending"]).order("status", desc=True).order("sent_at").limit(1).execute())
+        return response.data[0] if response.data else None
+
+    async def claim_broadcast(self, broadcast_id: str, changes: dict) -> bool:
+        response = await self._run(lambda: self._client.table("broadcast_messages").update({**changes, "status": "sending"}).eq("id", broadcast_id).eq("status", "pending").select("id").execute())
+        return bool(response.data)
+
+    async def update_broadcast(self, broadcast_id: str, changes: dict):
+        await self._run(lambda: self._client.table("broadcast_messages").update(changes).eq("id", broadcast_id).execute())
+
+    async def get_broadcast_recipients(self, after_id: int | None, limit: int) -> list:
+        def _fetch():
+            query = self._client.table("profiles").select("telegram_user_id").eq("is_banned", False).not_.is_("telegram_user_id", "null")
+            if after_id is not None:
+                query = query.gt("telegram_user_id", after_id)
+            return query.order("telegram_user_id").limit(limit).execute()
+        response = await self._run(_fetch)
+        return [row["telegram_user_id"] for row in response.data or []]
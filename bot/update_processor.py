@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from collections import deque
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates from different users concurrently, and each user's one at a time.
+
+    The order conversation and the cart in user_data assume a user's updates
+    are handled strictly in the order they arrive, so every update belongs to
+    its user (or its chat, for updates without one). The first update for a
+    key is processed straight away and then works through a queue of that
+    key's updates that arrived meanwhile; later updates are only appended to
+    the queue. The application takes a slot of `max_concurrent_updates`
+    before it hands an update over, and queued updates give theirs back at
+    once, so one user sending a backlog holds a single slot and never keeps
+    other users waiting. Queues are dropped as soon as they run empty.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # key -> updates waiting behind the one being processed
+        self._queues = {}
+
+    @staticmethod
+    def key(update: object) -> tuple | None:
+        if isinstance(update, Update):
+            if update.effective_user is not None:
+                return ('user', update.effective_user.id)
+            if update.effective_chat is not None:
+                return ('chat', update.effective_chat.id)
+        return None
+
+    async def do_process_update(self, update: object, coroutine):
+        key = self.key(update)
+        if key is None:
+            await coroutine
+            return
+        queue = self._queues.get(key)
+        if queue is not None:
+            queue.append(coroutine)
+            return
+        queue = self._queues[key] = deque([coroutine])
+        try:
+            while queue:
+                try:
+                    await queue.popleft()
+                except Exception:
+                    logger.exception(f"Error processing an update for {key}")
+        finally:
+            del self._queues[key]
+            # Only left over when cancelled at shutdown
+            while queue:
+                queue.popleft().close()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,171 @@
+import time
+import asyncio
+import logging
+from typing import NamedTuple
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+import background
+from catalog import catalog
+
+logger = logging.getLogger(__name__)
+
+class View(NamedTuple):
+    """A ready-to-send message: pass it on with reply_text(**view._asdict())."""
+    text: str
+    parse_mode: str | None
+    reply_markup: InlineKeyboardMarkup | None
+
+def render_page(rows: list, page: int, total: int, per_page: int) -> View:
+    total_pages = max((total + per_page - 1) // per_page, 1)
+
+    keyboard = [
+        [InlineKeyboardButton(f"{product['name']} - {product['price']}", callback_data=f"product_{product['product_id']}")]
+        for product in rows
+    ]
+
+    # Pagination buttons
+    nav_buttons = []
+    if page > 0:
+        nav_buttons.append(InlineKeyboardButton("⬅️ Previous", callback_data=f"browse_products_{page-1}"))
+    if page < total_pages - 1:
+        nav_buttons.append(InlineKeyboardButton("Next ➡️", callback_data=f"browse_products_{page+1}"))
+    if nav_buttons:
+        keyboard.append(nav_buttons)
+
+    keyboard.append([InlineKeyboardButton("🔍 Search", callback_data="search_prompt")])
+    keyboard.append([InlineKeyboardButton("« Back to Menu", callback_data="back_to_menu")])
+
+    text = f"📦 *Available Products* (Page {page+1}/{total_pages})\n\nSelect a product to view details:"
+    return View(text, 'Markdown', InlineKeyboardMarkup(keyboard))
+
+def _product_text(product: dict) -> str:
+    return f"""
+📦 *{product['name']}*
+🆔 Product ID: {product['product_id']}
+
+{product['description'] or 'No description available'}
+
+💰 Price: {product['price']}
+📊 Stock: {product['stock']} units
+"""
+
+# Product details opened from a browse page or search result
+def render_product(product: dict) -> View:
+    keyboard = [
+        [InlineKeyboardButton("🛒 Order Now", callback_data=f"order_{product['product_id']}")],
+        [InlineKeyboardButton("« Back to Products", callback_data="browse_products_0")]
+    ]
+    return View(_product_text(product), 'Markdown', InlineKeyboardMarkup(keyboard))
+
+# Product details opened from a t.me/<bot>?start=<product_id> link
+def render_deep_link(product: dict) -> View:
+    keyboard = [
+        [InlineKeyboardButton("🛒 Order This Product", callback_data=f"order_{product['product_id']}")],
+        [InlineKeyboardButton("📦 Browse All Products", callback_data="browse_products_0")]
+    ]
+    text = _product_text(product) + "\nClick below to order this product!\n"
+    return View(text, 'Markdown', InlineKeyboardMarkup(keyboard))
+
+class ViewCache:
+    """Rendered browse pages and product messages, kept per catalog version.
+
+    Each view is stored with the catalog rows it was rendered from. While the
+    catalog still holds those same rows a click reuses the view as is: no
+    query and no formatting. When the catalog resets (its version moves on)
+    the old views are dropped, and the ones that were clicked since the
+    previous reset are rendered again in a single background batch: one
+    query per browse page and one for all product views together. Views
+    nobody opened are rendered on their next click instead, so an idle
+    catalog costs nothing. A product dropped from the catalog alone, e.g.
+    after its stock changed, is rendered again on its next click.
+    """
+
+    def __init__(self):
+        self.version = catalog.version
+        self._views = {}
+        # Keys clicked under the current version; only these are rendered again after a reset
+        self._used = set()
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+    def _check_version(self):
+        if catalog.version == self.version:
+            return
+        used = list(self._used)
+        self._views = {}
+        self._used = set()
+        self.version = catalog.version
+        if used:
+            background.start(self.regenerate(used), name="view-regenerate")
+
+    async def _render_page(self, key: tuple) -> bool:
+        try:
+            return (await self._page(key[1], key[2]))[0] is not None
+        except Exception as e:
+            logger.error(f"Error rendering {key}: {e}")
+            return False
+
+    async def _render_products(self, keys: list) -> int:
+        try:
+            products = await catalog.get_products([key[1] for key in keys])
+        except Exception as e:
+            logger.error(f"Error rendering {len(keys)} product views: {e}")
+            return 0
+        self._check_version()
+        return sum(self._product_view(key, products.get(key[1])) is not None for key in keys)
+
+    # Render every key again at once, e.g. the views clicked under the previous catalog version
+    async def regenerate(self, keys: list):
+        start = time.perf_counter()
+        renders = [self._render_page(key) for key in keys if key[0] == 'page']
+        product_keys = [key for key in keys if key[0] != 'page']
+        if product_keys:
+            renders.append(self._render_products(product_keys))
+        rendered = await asyncio.gather(*renders)
+        logger.info(f"Rendered {sum(rendered)} views for catalog version {self.version} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+    # The view for a browse page and the page it shows: a page past the end, e.g. from an old
+    # button after the catalog shrank, shows the last page instead
+    async def _page(self, page: int, per_page: int) -> tuple[View | None, int]:
+        rows, total = await catalog.get_page(page, per_page)
+        self._check_version()
+        last_page = max((total - 1) // per_page, 0)
+        if page > last_page:
+            return await self._page(last_page, per_page)
+        key = ('page', page, per_page)
+        cached = self._views.get(key)
+        if cached and cached[0] is rows and cached[1] == total:
+            return cached[2], page
+        if not rows and page == 0:
+            return None, page
+        view = render_page(rows, page, total, per_page)
+        self._views[key] = (rows, total, view)
+        return view, page
+
+    # Browse page `page` (or the last one, if there are fewer), or None when there are no products at all
+    async def page(self, page: int, per_page: int) -> View | None:
+        view, page = await self._page(page, per_page)
+        self._used.add(('page', page, per_page))
+        return view
+
+    # The view for a product key from its catalog row, rendering it only if the row changed
+    def _product_view(self, key: tuple, product: dict | None) -> View | None:
+        deep_link = key[0] == 'deep_link'
+        if not product or (deep_link and not product.get('is_active')):
+            return None
+        cached = self._views.get(key)
+        if cached and cached[0] is product:
+            return cached[1]
+        view = render_deep_link(product) if deep_link else render_product(product)
+        self._views[key] = (product, view)
+        return view
+
+    # Product details, or None when the product does not exist (or is inactive, for deep links)
+    async def product(self, product_id: str, deep_link: bool = False) -> View | None:
+        product = await catalog.get_product(product_id, active_only=deep_link)
+        self._check_version()
+        key = ('deep_link' if deep_link else 'product', product_id)
+        self._used.add(key)
+        return self._product_view(key, product)
+
+views = ViewCache()
@@ -40,6 +40,7 @@ CREATE TABLE IF NOT EXISTS orders (
     total_cost NUMERIC(10, 2) NOT NULL,
     delivery_type VARCHAR(50) NOT NULL,
     payment_image_url TEXT,
+    receipt_file_id TEXT,
     status VARCHAR(20) DEFAULT 'pending',
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW()
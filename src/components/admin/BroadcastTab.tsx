@@ -81,7 +81,7 @@ const BroadcastTab = () => {
             {loading ? "Sending..." : "Send Broadcast"}
           </Button>
           <p className="text-sm text-muted-foreground">
-            This message will be saved to the database. Your Telegram bot should check for new broadcast messages and send them to all active users.
+            This message will be saved to the database. The Telegram bot picks it up within a few seconds and sends it to all active users.
           </p>
         </CardContent>
       </Card>
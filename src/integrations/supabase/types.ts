@@ -16,25 +16,40 @@ export type Database = {
     Tables: {
       broadcast_messages: {
         Row: {
+          completed_at: string | null
+          failed_count: number
           id: string
+          last_recipient_id: number | null
           message: string
           recipient_count: number | null
           sent_at: string | null
           sent_by: string
+          started_at: string | null
+          status: string
         }
         Insert: {
+          completed_at?: string | null
+          failed_count?: number
           id?: string
+          last_recipient_id?: number | null
           message: string
           recipient_count?: number | null
           sent_at?: string | null
           sent_by: string
+          started_at?: string | null
+          status?: string
         }
         Update: {
+          completed_at?: string | null
+          failed_count?: number
           id?: string
+          last_recipient_id?: number | null
           message?: string
           recipient_count?: number | null
           sent_at?: string | null
           sent_by?: string
+          started_at?: string | null
+          status?: string
         }
         Relationships: []
       }
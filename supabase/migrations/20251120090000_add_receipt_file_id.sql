@@ -0,0 +1,4 @@
+-- Store the Telegram file_id of each order's PDF receipt
+-- The bot uploads a receipt once and resends it by file_id afterwards
+
+ALTER TABLE public.orders ADD COLUMN IF NOT EXISTS receipt_file_id TEXT;
@@ -0,0 +1,97 @@
+-- Place an order in a single round trip
+-- Checks and decrements stock for every cart item, inserts the order and
+-- upserts the customer's profile in one transaction, so two concurrent
+-- checkouts can never sell the same unit twice. Line prices and the total
+-- come from the products table, whatever prices the caller sent.
+
+CREATE OR REPLACE FUNCTION public.place_order(
+  _order_string TEXT,
+  _telegram_user_id BIGINT,
+  _username TEXT,
+  _user_name TEXT,
+  _phone TEXT,
+  _address JSONB,
+  _items JSONB,
+  _delivery_type public.delivery_type
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  _line RECORD;
+  _price NUMERIC(10, 2);
+  _prices JSONB := '{}'::JSONB;
+  _priced_items JSONB;
+  _total_cost NUMERIC(10, 2);
+BEGIN
+  IF jsonb_typeof(_items) <> 'array' OR jsonb_array_length(_items) = 0 THEN
+    RAISE EXCEPTION 'empty_cart' USING ERRCODE = 'P0001';
+  END IF;
+
+  IF EXISTS (
+    SELECT 1 FROM jsonb_to_recordset(_items) AS item(quantity INTEGER)
+    WHERE item.quantity IS NULL OR item.quantity <= 0
+  ) THEN
+    RAISE EXCEPTION 'invalid_quantity' USING ERRCODE = 'P0001';
+  END IF;
+
+  -- One decrement per product (the same product may be in the cart twice),
+  -- taken in product_id order so concurrent orders lock rows consistently
+  FOR _line IN
+    SELECT item.product_id, SUM(item.quantity) AS quantity
+    FROM jsonb_to_recordset(_items) AS item(product_id TEXT, quantity INTEGER)
+    GROUP BY item.product_id
+    ORDER BY item.product_id
+  LOOP
+    UPDATE public.products
+    SET stock = stock - _line.quantity
+    WHERE product_id = _line.product_id
+      AND is_active = true
+      AND stock >= _line.quantity
+    RETURNING price INTO _price;
+
+    IF NOT FOUND THEN
+      RAISE EXCEPTION 'out_of_stock' USING ERRCODE = 'P0001', DETAIL = _line.product_id;
+    END IF;
+    _prices := _prices || jsonb_build_object(_line.product_id, _price);
+  END LOOP;
+
+  -- The cart lines as sent, each with the price read from its (now locked) product row
+  SELECT jsonb_agg(line.item || jsonb_build_object('price', _prices -> (line.item ->> 'product_id')) ORDER BY line.position)
+  INTO _priced_items
+  FROM jsonb_array_elements(_items) WITH ORDINALITY AS line(item, position);
+
+  SELECT SUM((item ->> 'quantity')::INTEGER * (item ->> 'price')::NUMERIC)
+  INTO _total_cost
+  FROM jsonb_array_elements(_priced_items) AS item;
+
+  INSERT INTO public.orders (
+    order_string, telegram_user_id, user_name, phone, address, items, total_cost, delivery_type, status
+  )
+  VALUES (
+    _order_string, _telegram_user_id, _user_name, _phone, _address, _priced_items, _total_cost, _delivery_type, 'pending'
+  );
+
+  -- Saving the profile is best effort: a customer without a matching auth user
+  -- (profiles.id references auth.users) cannot get a new profile row, and an
+  -- order must not fail because of that
+  BEGIN
+    INSERT INTO public.profiles (telegram_user_id, username, phone)
+    VALUES (_telegram_user_id, _username, _phone)
+    ON CONFLICT (telegram_user_id) DO UPDATE
+    SET username = EXCLUDED.username, phone = EXCLUDED.phone;
+  EXCEPTION WHEN not_null_violation OR foreign_key_violation THEN
+    RAISE WARNING 'place_order: profile for telegram user % not saved: %', _telegram_user_id, SQLERRM;
+  END;
+
+  RETURN jsonb_build_object('order_string', _order_string, 'total_cost', _total_cost, 'items', _priced_items);
+END;
+$$;
+
+-- Only the bot may place orders: it trusts the telegram_user_id it is given.
+-- Functions are executable by PUBLIC (and Supabase also grants anon and
+-- authenticated) by default, so take that away explicitly.
+REVOKE EXECUTE ON FUNCTION public.place_order(TEXT, BIGINT, TEXT, TEXT, TEXT, JSONB, JSONB, public.delivery_type) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.place_order(TEXT, BIGINT, TEXT, TEXT, TEXT, JSONB, JSONB, public.delivery_type) TO service_role;
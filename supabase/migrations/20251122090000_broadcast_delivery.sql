@@ -0,0 +1,21 @@
+-- Track delivery of broadcast messages sent by the Telegram bot
+-- The bot picks up pending broadcasts, sends them to every non-banned profile
+-- in telegram_user_id order, and checkpoints the last recipient after each
+-- batch so a restart resumes where it stopped.
+
+ALTER TABLE public.broadcast_messages
+  ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'pending'
+    CHECK (status IN ('pending', 'sending', 'sent', 'skipped')),
+  ADD COLUMN IF NOT EXISTS last_recipient_id BIGINT,
+  ADD COLUMN IF NOT EXISTS failed_count INTEGER NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS started_at TIMESTAMP WITH TIME ZONE,
+  ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP WITH TIME ZONE;
+
+-- Broadcasts saved before the bot could send them are not sent after the fact
+UPDATE public.broadcast_messages SET status = 'skipped' WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS broadcast_messages_status_idx
+ON public.broadcast_messages (status, sent_at);
+
+-- No policies for the bot: it connects with the service role key, which is
+-- never shipped to browsers, so the public anon key gains no access here
@@ -0,0 +1,6 @@
+-- Index for the bot's /orders history
+-- Pages are read newest first with a keyset on (created_at, id), so each page
+-- is a short range scan of one user's orders however far back it goes.
+
+CREATE INDEX IF NOT EXISTS idx_orders_user_history
+  ON public.orders (telegram_user_id, created_at DESC, id DESC);
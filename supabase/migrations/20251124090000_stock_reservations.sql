@@ -0,0 +1,275 @@
+-- Hold stock while a customer checks out
+-- Adding an item to the cart moves its quantity from products.stock into a
+-- reservation, so the shown stock is what can still be bought. place_order
+-- takes the customer's holds instead of decrementing stock again, /cancel
+-- hands them back, and holds left behind expire after a TTL and are handed
+-- back in batches by the bot. Holds live in their own table: the orders
+-- table is never touched until the order is placed.
+
+CREATE TABLE IF NOT EXISTS public.stock_reservations (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  telegram_user_id BIGINT NOT NULL,
+  product_id TEXT NOT NULL REFERENCES public.products(product_id) ON DELETE CASCADE,
+  quantity INTEGER NOT NULL CHECK (quantity > 0),
+  expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS stock_reservations_user_idx
+ON public.stock_reservations (telegram_user_id, product_id);
+
+CREATE INDEX IF NOT EXISTS stock_reservations_expires_at_idx
+ON public.stock_reservations (expires_at);
+
+-- Only reachable through the functions below (and visible to admins)
+ALTER TABLE public.stock_reservations ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Admins can view stock reservations"
+ON public.stock_reservations FOR SELECT
+TO authenticated
+USING (public.has_role(auth.uid(), 'admin'));
+
+-- Hold `_quantity` of a product for a customer until `_ttl_seconds` from now, and keep
+-- the rest of their cart held as long. Raises out_of_stock when not enough is left.
+CREATE OR REPLACE FUNCTION public.reserve_stock(
+  _telegram_user_id BIGINT,
+  _product_id TEXT,
+  _quantity INTEGER,
+  _ttl_seconds INTEGER
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  _expires_at TIMESTAMP WITH TIME ZONE := now() + make_interval(secs => _ttl_seconds);
+  _reservation_id UUID;
+BEGIN
+  IF _quantity IS NULL OR _quantity <= 0 THEN
+    RAISE EXCEPTION 'invalid_quantity' USING ERRCODE = 'P0001';
+  END IF;
+
+  -- Before the product row is locked, so this never waits on the sweeper while holding it
+  UPDATE public.stock_reservations
+  SET expires_at = _expires_at
+  WHERE telegram_user_id = _telegram_user_id;
+
+  UPDATE public.products
+  SET stock = stock - _quantity
+  WHERE product_id = _product_id
+    AND is_active = true
+    AND stock >= _quantity;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'out_of_stock' USING ERRCODE = 'P0001', DETAIL = _product_id;
+  END IF;
+
+  INSERT INTO public.stock_reservations (telegram_user_id, product_id, quantity, expires_at)
+  VALUES (_telegram_user_id, _product_id, _quantity, _expires_at)
+  RETURNING id INTO _reservation_id;
+
+  RETURN jsonb_build_object('id', _reservation_id, 'expires_at', _expires_at);
+END;
+$$;
+
+-- Put held quantities back into stock, one update per product in product_id order
+-- so concurrent callers lock product rows consistently
+CREATE OR REPLACE FUNCTION public.return_reserved_stock(_product_ids TEXT[], _quantities INTEGER[])
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  FOR _i IN 1 .. COALESCE(array_length(_product_ids, 1), 0) LOOP
+    UPDATE public.products
+    SET stock = stock + _quantities[_i]
+    WHERE product_id = _product_ids[_i];
+  END LOOP;
+END;
+$$;
+
+-- Hand back every hold a customer has, e.g. on /cancel. Returns how many were released.
+CREATE OR REPLACE FUNCTION public.release_reservations(_telegram_user_id BIGINT)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  _product_ids TEXT[];
+  _quantities INTEGER[];
+  _count INTEGER;
+BEGIN
+  WITH released AS (
+    DELETE FROM public.stock_reservations
+    WHERE telegram_user_id = _telegram_user_id
+    RETURNING product_id, quantity
+  ), totals AS (
+    SELECT product_id, SUM(quantity)::INTEGER AS quantity, COUNT(*) AS holds
+    FROM released
+    GROUP BY product_id
+  )
+  SELECT array_agg(product_id ORDER BY product_id), array_agg(quantity ORDER BY product_id), COALESCE(SUM(holds), 0)
+  INTO _product_ids, _quantities, _count
+  FROM totals;
+
+  PERFORM public.return_reserved_stock(_product_ids, _quantities);
+  RETURN _count;
+END;
+$$;
+
+-- Hand back up to `_batch_size` expired holds. Holds being consumed or released by
+-- someone else right now are skipped rather than waited for. Returns how many were released.
+CREATE OR REPLACE FUNCTION public.release_expired_reservations(_batch_size INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  _product_ids TEXT[];
+  _quantities INTEGER[];
+  _count INTEGER;
+BEGIN
+  WITH expired AS (
+    DELETE FROM public.stock_reservations
+    WHERE id IN (
+      SELECT id
+      FROM public.stock_reservations
+      WHERE expires_at <= now()
+      ORDER BY expires_at
+      LIMIT _batch_size
+      FOR UPDATE SKIP LOCKED
+    )
+    RETURNING product_id, quantity
+  ), totals AS (
+    SELECT product_id, SUM(quantity)::INTEGER AS quantity, COUNT(*) AS holds
+    FROM expired
+    GROUP BY product_id
+  )
+  SELECT array_agg(product_id ORDER BY product_id), array_agg(quantity ORDER BY product_id), COALESCE(SUM(holds), 0)
+  INTO _product_ids, _quantities, _count
+  FROM totals;
+
+  PERFORM public.return_reserved_stock(_product_ids, _quantities);
+  RETURN _count;
+END;
+$$;
+
+-- place_order now takes the customer's holds on the cart's products first and only
+-- decrements stock for whatever they do not cover (a hold that expired and was
+-- released, or an item added without one). Surplus held stock goes back.
+-- Prices and the total still come from the products table.
+CREATE OR REPLACE FUNCTION public.place_order(
+  _order_string TEXT,
+  _telegram_user_id BIGINT,
+  _username TEXT,
+  _user_name TEXT,
+  _phone TEXT,
+  _address JSONB,
+  _items JSONB,
+  _delivery_type public.delivery_type
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  _line RECORD;
+  _held JSONB;
+  _needed INTEGER;
+  _price NUMERIC(10, 2);
+  _prices JSONB := '{}'::JSONB;
+  _priced_items JSONB;
+  _total_cost NUMERIC(10, 2);
+BEGIN
+  IF jsonb_typeof(_items) <> 'array' OR jsonb_array_length(_items) = 0 THEN
+    RAISE EXCEPTION 'empty_cart' USING ERRCODE = 'P0001';
+  END IF;
+
+  IF EXISTS (
+    SELECT 1 FROM jsonb_to_recordset(_items) AS item(quantity INTEGER)
+    WHERE item.quantity IS NULL OR item.quantity <= 0
+  ) THEN
+    RAISE EXCEPTION 'invalid_quantity' USING ERRCODE = 'P0001';
+  END IF;
+
+  -- Taken before any product row is locked, like the sweeper does
+  WITH taken AS (
+    DELETE FROM public.stock_reservations
+    WHERE telegram_user_id = _telegram_user_id
+      AND product_id IN (SELECT item.product_id FROM jsonb_to_recordset(_items) AS item(product_id TEXT))
+    RETURNING product_id, quantity
+  )
+  SELECT COALESCE(jsonb_object_agg(product_id, quantity), '{}'::JSONB)
+  INTO _held
+  FROM (SELECT product_id, SUM(quantity) AS quantity FROM taken GROUP BY product_id) AS totals;
+
+  -- One update per product (the same product may be in the cart twice),
+  -- taken in product_id order so concurrent orders lock rows consistently
+  FOR _line IN
+    SELECT item.product_id, SUM(item.quantity) AS quantity
+    FROM jsonb_to_recordset(_items) AS item(product_id TEXT, quantity INTEGER)
+    GROUP BY item.product_id
+    ORDER BY item.product_id
+  LOOP
+    _needed := _line.quantity - COALESCE((_held ->> _line.product_id)::INTEGER, 0);
+
+    UPDATE public.products
+    SET stock = stock - _needed
+    WHERE product_id = _line.product_id
+      AND is_active = true
+      AND stock >= _needed
+    RETURNING price INTO _price;
+
+    IF NOT FOUND THEN
+      RAISE EXCEPTION 'out_of_stock' USING ERRCODE = 'P0001', DETAIL = _line.product_id;
+    END IF;
+    _prices := _prices || jsonb_build_object(_line.product_id, _price);
+  END LOOP;
+
+  SELECT jsonb_agg(line.item || jsonb_build_object('price', _prices -> (line.item ->> 'product_id')) ORDER BY line.position)
+  INTO _priced_items
+  FROM jsonb_array_elements(_items) WITH ORDINALITY AS line(item, position);
+
+  SELECT SUM((item ->> 'quantity')::INTEGER * (item ->> 'price')::NUMERIC)
+  INTO _total_cost
+  FROM jsonb_array_elements(_priced_items) AS item;
+
+  INSERT INTO public.orders (
+    order_string, telegram_user_id, user_name, phone, address, items, total_cost, delivery_type, status
+  )
+  VALUES (
+    _order_string, _telegram_user_id, _user_name, _phone, _address, _priced_items, _total_cost, _delivery_type, 'pending'
+  );
+
+  -- Best effort, as before: customers without an auth user cannot get a new profile row
+  BEGIN
+    INSERT INTO public.profiles (telegram_user_id, username, phone)
+    VALUES (_telegram_user_id, _username, _phone)
+    ON CONFLICT (telegram_user_id) DO UPDATE
+    SET username = EXCLUDED.username, phone = EXCLUDED.phone;
+  EXCEPTION WHEN not_null_violation OR foreign_key_violation THEN
+    RAISE WARNING 'place_order: profile for telegram user % not saved: %', _telegram_user_id, SQLERRM;
+  END;
+
+  RETURN jsonb_build_object('order_string', _order_string, 'total_cost', _total_cost, 'items', _priced_items);
+END;
+$$;
+
+-- These trust the telegram_user_id they are given, so only the bot (which
+-- connects with the service role key) may call them. Anyone holding the
+-- public anon key could otherwise hold a whole drop or release other
+-- customers' holds.
+REVOKE EXECUTE ON FUNCTION public.reserve_stock(BIGINT, TEXT, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.release_reservations(BIGINT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.release_expired_reservations(INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.place_order(TEXT, BIGINT, TEXT, TEXT, TEXT, JSONB, JSONB, public.delivery_type) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.return_reserved_stock(TEXT[], INTEGER[]) FROM PUBLIC, anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.reserve_stock(BIGINT, TEXT, INTEGER, INTEGER) TO service_role;
+GRANT EXECUTE ON FUNCTION public.release_reservations(BIGINT) TO service_role;
+GRANT EXECUTE ON FUNCTION public.release_expired_reservations(INTEGER) TO service_role;
+GRANT EXECUTE ON FUNCTION public.place_order(TEXT, BIGINT, TEXT, TEXT, TEXT, JSONB, JSONB, public.delivery_type) TO service_role;